@@ -1,13 +1,22 @@
+import os
 from flask import Flask, jsonify, request
 from motion_tracker import MotionTracker
 from lstm_model import LSTMModel
 from mujoco_sim import MujocoSimulator
+from training_jobs import TrainingJobRunner
+from inference import MicroBatcher
 import numpy as np
 
 app = Flask(__name__)
-tracker = MotionTracker()
-model = LSTMModel(input_shape=(50, 17))
+tracker = MotionTracker(os.environ.get('MOTION_DATA_PATH'), cache_dir=os.environ.get('MOTION_CACHE_DIR'))
+MODEL_PATH = os.environ.get('LSTM_MODEL_PATH', "lstm_model.h5")
+# Load the saved weights once at startup; predictions then go through a warmed, compiled forward pass
+model = LSTMModel.load(MODEL_PATH) if os.path.exists(MODEL_PATH) else LSTMModel(input_shape=(50, 17))
+training = TrainingJobRunner(lambda: LSTMModel(input_shape=(50, 17)), model_path=MODEL_PATH, model=model)
+predictions = MicroBatcher(training.current_model, max_batch_size=int(os.environ.get('PREDICT_MAX_BATCH', 64)), max_delay=float(os.environ.get('PREDICT_MAX_DELAY_MS', 5)) / 1000)
+predictions.warm()
 sim = MujocoSimulator()
+TRAIN_OPTIONS = {'epochs': int, 'batch_size': int, 'validation_split': float, 'normalize': str}
 
 @app.route('/load_data', methods=['GET'])
 def load_data():
@@ -18,11 +27,48 @@ def load_data():
 @app.route('/train', methods=['POST'])
 def train_model():
     data = request.json
-    X = np.array(data['sequences'])
+    X = np.array(data['sequences'], dtype=np.float32)
     y = np.array(data['labels'])
-    history = model.train(X, y)
-    model.save("lstm_model.h5")
-    return jsonify({"message": "Model trained", "history": history.history})
+    options = {name: cast(data[name]) for name, cast in TRAIN_OPTIONS.items() if data.get(name) is not None}
+    job_id = training.submit(X, y, **options)
+    return jsonify({"message": "Training started", "job_id": job_id, "status_url": f"/train/{job_id}"}), 202
+
+@app.route('/train', methods=['GET'])
+def list_training_jobs():
+    return jsonify({"jobs": training.list()})
+
+@app.route('/train/<job_id>', methods=['GET'])
+def training_status(job_id):
+    status = training.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown training job {job_id}"}), 404
+    return jsonify(status)
+
+@app.route('/train/<job_id>', methods=['DELETE'])
+def cancel_training(job_id):
+    status = training.cancel(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown training job {job_id}"}), 404
+    return jsonify(status)
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    sequences = np.asarray(request.json['sequences'], dtype=np.float32)
+    single = sequences.ndim == 2
+    if single:
+        sequences = sequences[np.newaxis]
+    expected = training.current_model().input_shape
+    if sequences.ndim != 3 or sequences.shape[1:] != expected or not len(sequences):
+        return jsonify({"error": f"Expected sequences shaped (timesteps, features) = {expected}, or a list of them"}), 400
+    probabilities = predictions.predict(sequences)
+    classes = probabilities.argmax(axis=1)
+    if single:
+        return jsonify({"probabilities": probabilities[0].tolist(), "class": int(classes[0])})
+    return jsonify({"probabilities": probabilities.tolist(), "classes": classes.tolist()})
+
+@app.route('/predict/stats', methods=['GET'])
+def predict_stats():
+    return jsonify(predictions.stats())
 
 @app.route('/simulate', methods=['POST'])
 def simulate():
@@ -33,4 +79,4 @@ def simulate():
     return jsonify({"image": img.tolist()})
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000, threaded=True)
\ No newline at end of file
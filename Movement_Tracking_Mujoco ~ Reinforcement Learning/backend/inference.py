@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+class MicroBatcher:
+    def __init__(self, get_model, max_batch_size=64, max_delay=0.005):
+        self.get_model = get_model
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.stopping = False
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='predict-batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, X):
+        """Queue windows for prediction and return a future for their outputs."""
+        future = Future()
+        X = np.asarray(X, dtype=np.float32)
+        with self.lock:
+            if self.stopping:
+                future.set_exception(RuntimeError("Prediction batcher is stopped"))
+                return future
+            self.requests.put((X, future))
+        return future
+
+    def predict(self, X, timeout=None):
+        """Predict a (windows, timesteps, features) array, sharing a model call with concurrent requests."""
+        return self.submit(X).result(timeout)
+
+    def warm(self):
+        """Trace the compiled predict function once so the first request does not pay for it."""
+        model = self.get_model()
+        model.predict_batch(np.zeros((1,) + model.input_shape, dtype=np.float32))
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch = [request]
+            rows = len(request[0])
+            deadline = time.perf_counter() + self.max_delay
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)
+                    break
+                batch.append(request)
+                rows += len(request[0])
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        try:
+            outputs = self.get_model().predict_batch(np.concatenate([X for X, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(outputs)
+        offset = 0
+        for X, future in batch:
+            future.set_result(outputs[offset:offset + len(X)])
+            offset += len(X)
+
+    def stats(self):
+        """Report how many model calls were made and how many windows they covered."""
+        return {'batches': self.batches, 'rows': self.rows, 'mean_batch_size': self.rows / self.batches if self.batches else 0.0}
+
+    def stop(self):
+        """Finish the batches already queued, then fail anything still waiting so no caller hangs."""
+        with self.lock:
+            self.stopping = True
+            self.requests.put(None)
+        self.thread.join()
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request[1].set_exception(RuntimeError("Prediction batcher is stopped"))
\ No newline at end of file
@@ -1,6 +1,54 @@
+import math
+import time
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
+from motion_tracker import MotionTracker, normalize_windows
+
+def window_dataset(windows, labels, indices, batch_size=32, normalize=None, shuffle=False, shuffle_buffer=10000, cache=None, seed=None):
+    """Stream (windows, labels) batches through tf.data, gathering each batch from the window view on demand."""
+    labels = np.asarray(labels)
+    window_shape = tuple(windows.shape[1:])
+
+    def gather(batch):
+        batch = np.sort(batch)
+        X = normalize_windows(np.asarray(windows[batch], dtype=np.float32), normalize)
+        return X.astype(np.float32, copy=False), labels[batch]
+
+    def load(batch):
+        X, y = tf.numpy_function(gather, [batch], (tf.float32, tf.as_dtype(labels.dtype)))
+        X.set_shape((None,) + window_shape)
+        y.set_shape((None,) + labels.shape[1:])
+        return X, y
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if cache is not None:
+        # cache gathered windows (in memory for '', on disk for a path) so later epochs skip the gather
+        dataset = dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE).unbatch().cache(cache)
+        if shuffle:
+            dataset = dataset.shuffle(min(shuffle_buffer, len(indices)), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size).apply(tf.data.experimental.assert_cardinality(math.ceil(len(indices) / batch_size)))
+    else:
+        if shuffle:
+            dataset = dataset.shuffle(min(shuffle_buffer, len(indices)), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+class StepRate(tf.keras.callbacks.Callback):
+    """Record training steps per second for each epoch in the history."""
+    def on_epoch_begin(self, epoch, logs=None):
+        self.steps = 0
+        self.started = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        rate = self.steps / (time.perf_counter() - self.started)
+        if logs is not None:
+            logs['steps_per_sec'] = rate
+        print(f"Epoch {epoch + 1}: {rate:.1f} steps/sec")
 
 class LSTMModel:
     def __init__(self, input_shape, num_classes=6):
@@ -12,16 +60,51 @@ class LSTMModel:
             Dense(num_classes, activation='softmax')
         ])
         self.model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+        self.predict_fn = None
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved model without building a fresh one first."""
+        instance = cls.__new__(cls)
+        instance.model = tf.keras.models.load_model(path)
+        instance.predict_fn = None
+        return instance
 
-    def train(self, X_train, y_train, epochs=10, batch_size=32):
-        """Train the LSTM model."""
-        history = self.model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, validation_split=0.2)
+    @property
+    def input_shape(self):
+        return tuple(self.model.input_shape[1:])
+
+    def train(self, X_train, y_train=None, epochs=10, batch_size=32, validation_split=0.2, validation_data=None, normalize=None, shuffle=True, shuffle_buffer=10000, cache=None, callbacks=None):
+        """Train the LSTM model from a tf.data pipeline over the motion windows."""
+        if isinstance(X_train, tf.data.Dataset):
+            train_data, validation = X_train, validation_data
+        else:
+            if validation_data is not None:
+                split = len(X_train)
+            else:
+                split = int(len(X_train) * (1 - validation_split))
+            train_data = window_dataset(X_train, y_train, np.arange(split), batch_size, normalize, shuffle, shuffle_buffer, cache)
+            if validation_data is None:
+                validation = window_dataset(X_train, y_train, np.arange(split, len(X_train)), batch_size, normalize) if split < len(X_train) else None
+            elif isinstance(validation_data, tf.data.Dataset):
+                validation = validation_data
+            else:
+                X_val, y_val = validation_data
+                validation = window_dataset(X_val, y_val, np.arange(len(X_val)), batch_size, normalize)
+        history = self.model.fit(train_data, epochs=epochs, validation_data=validation, shuffle=False, callbacks=[StepRate()] + list(callbacks or []))
         return history
 
     def predict(self, X):
         """Predict motion sequences."""
         return self.model.predict(X)
 
+    def predict_batch(self, X):
+        """Run one batch through a compiled tf.function, skipping Keras' per-call predict loop."""
+        if self.predict_fn is None:
+            signature = [tf.TensorSpec((None,) + self.input_shape, tf.float32)]
+            self.predict_fn = tf.function(lambda x: self.model(x, training=False), input_signature=signature)
+        return self.predict_fn(tf.convert_to_tensor(X, dtype=tf.float32)).numpy()
+
     def save(self, path):
         """Save the trained model."""
         self.model.save(path)
@@ -29,6 +112,7 @@ class LSTMModel:
 if __name__ == "__main__":
     # Example usage
     tracker = MotionTracker()
+    tracker.load_data()
     sequences = tracker.preprocess()
     y_dummy = np.random.randint(0, 6, (sequences.shape[0],))  # Dummy labels
     y_dummy = tf.keras.utils.to_categorical(y_dummy, num_classes=6)
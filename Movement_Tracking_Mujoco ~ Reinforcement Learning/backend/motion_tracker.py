@@ -1,27 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+NORMALIZATIONS = ('zscore', 'minmax')
+SAMPLE_BYTES = 64 * 1024
+INGEST_LOCK = threading.Lock()
+
+def normalize_windows(windows, method=None, eps=1e-8):
+    """Normalize each window per feature; returns a new array unless method is None."""
+    if method is None:
+        return windows
+    if method not in NORMALIZATIONS:
+        raise ValueError(f"Unknown normalization '{method}', expected one of {NORMALIZATIONS}")
+    windows = np.asarray(windows, dtype=np.float32)
+    if method == 'zscore':
+        mean = windows.mean(axis=-2, keepdims=True)
+        std = windows.std(axis=-2, keepdims=True)
+        return (windows - mean) / (std + eps)
+    low = windows.min(axis=-2, keepdims=True)
+    high = windows.max(axis=-2, keepdims=True)
+    return (windows - low) / (high - low + eps)
+
+def capture_key(path):
+    """Identify a capture by path, size, mtime and a hash of its first and last bytes."""
+    stat = os.stat(path)
+    digest = hashlib.sha1(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    with open(path, 'rb') as reader:
+        digest.update(reader.read(SAMPLE_BYTES))
+        reader.seek(max(stat.st_size - SAMPLE_BYTES, 0))
+        digest.update(reader.read(SAMPLE_BYTES))
+    return digest.hexdigest()[:16]
+
+def convert_capture(csv_path, npy_path, chunksize=100000, dtype=np.float32):
+    """Convert a CSV capture into an .npy file chunk by chunk, never holding the whole capture."""
+    directory, name = os.path.split(npy_path)
+    raw_fd, raw_path = tempfile.mkstemp(dir=directory, prefix=name + '.', suffix='.raw')
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=name + '.', suffix='.tmp')
+    rows, columns = 0, None
+    try:
+        with open(raw_fd, 'wb') as raw:
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+                if columns is None:
+                    # the first chunk decides which columns are numeric; later chunks are coerced to match
+                    columns = list(chunk.select_dtypes('number').columns)
+                values = chunk[columns].apply(pd.to_numeric, errors='coerce')
+                raw.write(np.ascontiguousarray(values.to_numpy(dtype=dtype)).tobytes())
+                rows += len(chunk)
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (rows, len(columns or []))}
+        with open(tmp_fd, 'wb') as writer, open(raw_path, 'rb') as raw:
+            np.lib.format.write_array_header_1_0(writer, header)
+            shutil.copyfileobj(raw, writer, 16 * 1024 * 1024)
+        os.replace(tmp_path, npy_path)
+    finally:
+        for path in (raw_path, tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return columns or []
 
 class MotionTracker:
-    def __init__(self, data_path=None):
+    def __init__(self, data_path=None, cache_dir=None, chunksize=100000):
         self.data_path = data_path
+        self.cache_dir = cache_dir
+        self.chunksize = chunksize
         self.motion_data = None
+        self.columns = None
+        self.cache_key = None
+
+    def cache_paths(self, key):
+        """Return the .npy and column sidecar paths for a capture key."""
+        cache_dir = self.cache_dir or os.path.join(os.path.dirname(os.path.abspath(self.data_path)), '.motion_cache')
+        stem = os.path.splitext(os.path.basename(self.data_path))[0]
+        base = os.path.join(cache_dir, f"{stem}-{key}")
+        return base + '.npy', base + '.json'
+
+    def ingest(self):
+        """Convert the CSV capture into the mmap cache if it is missing or stale."""
+        key = capture_key(self.data_path)
+        npy_path, meta_path = self.cache_paths(key)
+        with INGEST_LOCK:
+            if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+                os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+                columns = convert_capture(self.data_path, npy_path, self.chunksize)
+                with open(meta_path + '.tmp', 'w', encoding='utf-8') as writer:
+                    json.dump({'source': os.path.abspath(self.data_path), 'columns': columns}, writer)
+                os.replace(meta_path + '.tmp', meta_path)
+                print(f"Cached motion capture {self.data_path} as {npy_path}")
+                self.prune_cache(key)
+        return key, npy_path, meta_path
+
+    def prune_cache(self, key):
+        """Remove cached conversions of this capture that were made from an older version of the file."""
+        npy_path, _ = self.cache_paths(key)
+        cache_dir = os.path.dirname(npy_path)
+        stem = os.path.splitext(os.path.basename(self.data_path))[0]
+        for name in os.listdir(cache_dir):
+            if not (name.startswith(f"{stem}-") and name.endswith('.json')) or name == os.path.basename(npy_path)[:-4] + '.json':
+                continue
+            meta_path = os.path.join(cache_dir, name)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as reader:
+                    source = json.load(reader).get('source')
+            except (OSError, ValueError):
+                continue
+            if source == os.path.abspath(self.data_path):
+                for path in (meta_path, meta_path[:-5] + '.npy'):
+                    if os.path.exists(path):
+                        os.remove(path)
 
     def load_data(self):
         """Load motion data from a CSV or similar source."""
         if self.data_path:
-            self.motion_data = pd.read_csv(self.data_path)
+            key, npy_path, meta_path = self.ingest()
+            if key == self.cache_key and self.motion_data is not None:
+                return self.motion_data
+            with open(meta_path, 'r', encoding='utf-8') as reader:
+                self.columns = json.load(reader)['columns']
+            self.motion_data = np.load(npy_path, mmap_mode='r')
+            self.cache_key = key
             print(f"Loaded motion data with shape: {self.motion_data.shape}")
         else:
             # Simulate some dummy data (e.g., joint angles over time)
             self.motion_data = np.random.rand(1000, 17)  # 1000 timesteps, 17 joints
         return self.motion_data
 
-    def preprocess(self, sequence_length=50):
-        """Preprocess data into sequences for LSTM."""
-        X = []
-        for i in range(len(self.motion_data) - sequence_length):
-            X.append(self.motion_data[i:i + sequence_length])
-        return np.array(X)
+    def chunks(self, chunk_rows=100000, overlap=0):
+        """Yield consecutive row blocks of the loaded capture, each sharing `overlap` rows with the previous one."""
+        step = chunk_rows - overlap
+        if step <= 0:
+            raise ValueError("chunk_rows must be larger than overlap")
+        for start in range(0, max(len(self.motion_data) - overlap, 1), step):
+            yield self.motion_data[start:start + chunk_rows]
+
+    def windows(self, sequence_length=50, hop=1, dtype=np.float32):
+        """Return a read-only (windows, sequence_length, features) view over the recording."""
+        data = np.ascontiguousarray(self.motion_data, dtype=dtype)
+        if len(data) <= sequence_length:
+            return np.empty((0, sequence_length) + data.shape[1:], dtype=dtype)
+        view = sliding_window_view(data, sequence_length, axis=0)
+        # sliding_window_view puts the window axis last; move it next to the batch axis
+        return np.moveaxis(view, -1, 1)[:len(data) - sequence_length:hop]
+
+    def preprocess(self, sequence_length=50, hop=1, normalize=None, copy=False):
+        """Preprocess data into sequences for LSTM; a read-only view over the recording unless normalize or copy is set."""
+        windows = normalize_windows(self.windows(sequence_length, hop), normalize)
+        return np.array(windows) if copy and normalize is None else windows
+
+    def batches(self, batch_size=32, sequence_length=50, hop=1, normalize=None, labels=None):
+        """Yield normalized batches of windows, copying one batch at a time."""
+        windows = self.windows(sequence_length, hop)
+        for start in range(0, len(windows), batch_size):
+            X = normalize_windows(np.array(windows[start:start + batch_size]), normalize)
+            yield X if labels is None else (X, labels[start:start + batch_size])
 
 if __name__ == "__main__":
     tracker = MotionTracker()
@@ -0,0 +1,85 @@
+import os
+import threading
+import numpy as np
+import pytest
+from motion_tracker import MotionTracker, convert_capture
+
+def write_capture(path, rows, offset=0.0, bad_row=None):
+    with open(path, 'w', encoding='utf-8') as writer:
+        writer.write('t,label,j1,j2\n')
+        for i in range(rows):
+            j2 = 'bad' if i == bad_row else i * 2 + offset
+            writer.write(f"{i},walk,{i + offset},{j2}\n")
+
+def cache_files(tracker):
+    return sorted(os.listdir(os.path.dirname(tracker.cache_paths('x')[0])))
+
+def test_load_reuses_the_cache_until_the_capture_changes(tmp_path):
+    csv_path = str(tmp_path / 'capture.csv')
+    write_capture(csv_path, 30)
+    tracker = MotionTracker(csv_path, chunksize=7)
+    data = tracker.load_data()
+    assert tracker.columns == ['t', 'j1', 'j2']
+    np.testing.assert_array_equal(data[:, 1], np.arange(30))
+    first_key = tracker.cache_key
+    npy_path = tracker.cache_paths(first_key)[0]
+    converted_at = os.stat(npy_path).st_mtime_ns
+    assert MotionTracker(csv_path, chunksize=7).load_data().shape == (30, 3)
+    assert os.stat(npy_path).st_mtime_ns == converted_at
+    write_capture(csv_path, 40, offset=100.0)
+    os.utime(csv_path, ns=(converted_at + 10**9, converted_at + 10**9))
+    data = tracker.load_data()
+    assert tracker.cache_key != first_key
+    assert data.shape == (40, 3)
+    assert data[0, 1] == 100.0
+    assert cache_files(tracker) == [f"capture-{tracker.cache_key}.json", f"capture-{tracker.cache_key}.npy"]
+
+def test_later_chunks_are_coerced_to_the_first_chunks_columns(tmp_path):
+    csv_path = str(tmp_path / 'capture.csv')
+    write_capture(csv_path, 20, bad_row=12)
+    npy_path = str(tmp_path / 'capture.npy')
+    assert convert_capture(csv_path, npy_path, chunksize=5) == ['t', 'j1', 'j2']
+    data = np.load(npy_path)
+    assert data.shape == (20, 3)
+    assert np.isnan(data[12, 2])
+    assert data[13, 2] == 26
+    assert sorted(os.listdir(tmp_path)) == ['capture.csv', 'capture.npy']
+
+def test_failed_conversion_leaves_no_temp_files(tmp_path):
+    csv_path = str(tmp_path / 'capture.csv')
+    write_capture(csv_path, 10)
+    with open(csv_path, 'a', encoding='utf-8') as writer:
+        writer.write('1,2,3,4,5,6\n')
+    with pytest.raises(Exception):
+        convert_capture(csv_path, str(tmp_path / 'capture.npy'), chunksize=4)
+    assert os.listdir(tmp_path) == ['capture.csv']
+
+def test_concurrent_loads_convert_once(tmp_path):
+    csv_path = str(tmp_path / 'capture.csv')
+    write_capture(csv_path, 200)
+    errors, shapes = [], []
+
+    def load():
+        try:
+            shapes.append(MotionTracker(csv_path, chunksize=16).load_data().shape)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert shapes == [(200, 3)] * 8
+    assert len(cache_files(MotionTracker(csv_path))) == 2
+
+def test_preprocess_returns_a_read_only_view_unless_copied():
+    tracker = MotionTracker()
+    tracker.load_data()
+    view = tracker.preprocess(sequence_length=10)
+    assert view.shape == (990, 10, 17)
+    assert not view.flags.writeable
+    copy = tracker.preprocess(sequence_length=10, copy=True)
+    assert copy.flags.writeable
+    np.testing.assert_array_equal(copy, view)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import os
+import threading
+import numpy as np
+from training_jobs import TrainingJobRunner
+
+class FakeModel:
+    input_shape = (5, 3)
+
+    def __init__(self, saving=None, release=None):
+        self.saving = saving
+        self.release = release
+        self.warmed = []
+
+    def train(self, X, y, callbacks=None, **options):
+        pass
+
+    def predict_batch(self, X):
+        self.warmed.append(X.shape)
+        return np.zeros((len(X), 6), dtype=np.float32)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as writer:
+            writer.write('weights')
+        if self.saving:
+            self.saving.set()
+            self.release.wait(5)
+
+def runner(tmp_path, build_model, **options):
+    return TrainingJobRunner(build_model, model_path=str(tmp_path / 'model.h5'), model='served', **options)
+
+def test_publish_warms_and_swaps_the_model(tmp_path):
+    built = []
+    jobs = runner(tmp_path, lambda: built.append(FakeModel()) or built[-1])
+    job_id = jobs.submit(None, None, epochs=1)
+    jobs.shutdown()
+    assert jobs.status(job_id)['status'] == 'succeeded'
+    assert jobs.current_model() is built[0]
+    assert built[0].warmed == [(1, 5, 3)]
+    assert os.listdir(tmp_path) == ['model.h5']
+
+def test_cancel_before_the_swap_keeps_the_served_model(tmp_path):
+    saving, release = threading.Event(), threading.Event()
+    jobs = runner(tmp_path, lambda: FakeModel(saving, release))
+    job_id = jobs.submit(None, None, epochs=1)
+    assert saving.wait(5)
+    assert jobs.cancel(job_id)['status'] == 'running'
+    release.set()
+    jobs.shutdown()
+    status = jobs.status(job_id)
+    assert status['status'] == 'cancelled'
+    assert status['finished'] is not None
+    assert jobs.current_model() == 'served'
+    assert os.listdir(tmp_path) == []
+
+def test_cancel_after_success_is_a_no_op(tmp_path):
+    jobs = runner(tmp_path, FakeModel)
+    job_id = jobs.submit(None, None, epochs=1)
+    jobs.shutdown()
+    assert jobs.cancel(job_id)['status'] == 'succeeded'
+    assert jobs.status(job_id)['status'] == 'succeeded'
+    assert jobs.cancel('missing') is None
+
+def test_cancelled_queued_job_never_trains(tmp_path):
+    saving, release = threading.Event(), threading.Event()
+    jobs = runner(tmp_path, lambda: FakeModel(saving, release))
+    first = jobs.submit(None, None, epochs=1)
+    assert saving.wait(5)
+    second = jobs.submit(None, None, epochs=1)
+    assert jobs.cancel(second)['status'] == 'queued'
+    release.set()
+    jobs.shutdown()
+    assert jobs.status(first)['status'] == 'succeeded'
+    assert jobs.status(second)['status'] == 'cancelled'
+    assert jobs.status(second)['started'] is None
+
+def test_prune_keeps_the_newest_finished_jobs(tmp_path):
+    jobs = runner(tmp_path, FakeModel, max_workers=4, max_history=5)
+    submitted = []
+    for _ in range(20):
+        submitted.append(jobs.submit(None, None, epochs=1))
+        while jobs.status(submitted[-1])['finished'] is None:
+            threading.Event().wait(0.001)
+    jobs.shutdown()
+    assert [job['job_id'] for job in jobs.list()] == submitted[-5:][::-1]
\ No newline at end of file
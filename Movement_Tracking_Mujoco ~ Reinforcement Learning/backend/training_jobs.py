@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import tensorflow as tf
+
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+class TrainingJob:
+    def __init__(self, epochs):
+        self.id = uuid.uuid4().hex[:12]
+        self.status = 'queued'
+        self.epochs = epochs
+        self.epoch = 0
+        self.step = 0
+        self.metrics = []
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = threading.Event()
+
+    def to_dict(self):
+        """Summarize the job for status responses."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'epoch': self.epoch,
+            'epochs': self.epochs,
+            'step': self.step,
+            'progress': self.epoch / self.epochs if self.epochs else 0.0,
+            'metrics': list(self.metrics),
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+class JobProgress(tf.keras.callbacks.Callback):
+    """Publish per-epoch metrics to a job and stop training when it is cancelled."""
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.job.step = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.job.step = batch + 1
+        if self.job.cancel_requested.is_set():
+            self.model.stop_training = True
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.job.epoch = epoch + 1
+        self.job.metrics.append({'epoch': epoch + 1, **{name: float(value) for name, value in (logs or {}).items()}})
+
+class TrainingJobRunner:
+    def __init__(self, build_model, model_path="lstm_model.h5", model=None, max_workers=1, max_history=100):
+        self.build_model = build_model
+        self.model_path = model_path
+        self.model = model
+        self.max_history = max_history
+        self.jobs = {}
+        # reentrant so publish can finish the job inside the lock it swaps the model under
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='training-job')
+
+    def submit(self, X, y, **train_options):
+        """Queue a training run and return its job id immediately."""
+        job = TrainingJob(train_options.get('epochs', 10))
+        with self.lock:
+            self.jobs[job.id] = job
+            self.prune()
+        self.executor.submit(self.run, job, X, y, train_options)
+        return job.id
+
+    def run(self, job, X, y, train_options):
+        """Train a fresh model for the job and swap it in if training completes."""
+        if job.cancel_requested.is_set():
+            self.finish(job, 'cancelled')
+            return
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            model = self.build_model()
+            callbacks = list(train_options.pop('callbacks', None) or []) + [JobProgress(job)]
+            model.train(X, y, callbacks=callbacks, **train_options)
+            published = self.publish(model, job)
+        except Exception as e:
+            job.error = str(e)
+            self.finish(job, 'failed')
+            return
+        if not published:
+            self.finish(job, 'cancelled')
+
+    def publish(self, model, job):
+        """Save next to the served file, rename over it and switch the in-memory model; returns False if the job was cancelled first."""
+        if job.cancel_requested.is_set():
+            return False
+        # trace the compiled predict function before the swap so the first request after it does not pay for it
+        model.predict_batch(np.zeros((1,) + model.input_shape, dtype=np.float32))
+        root, extension = os.path.splitext(self.model_path)
+        staging_path = f"{root}.{job.id}.tmp{extension}"
+        model.save(staging_path)
+        with self.lock:
+            # cancel takes the same lock, so a request either lands before the swap or finds the job already succeeded
+            if job.cancel_requested.is_set():
+                os.remove(staging_path)
+                return False
+            os.replace(staging_path, self.model_path)
+            self.model = model
+            self.finish(job, 'succeeded')
+        return True
+
+    def finish(self, job, status):
+        # finished is set first so prune never sorts a finished job without a timestamp
+        with self.lock:
+            job.finished = time.time()
+            job.status = status
+
+    def current_model(self):
+        """Return the model currently being served."""
+        with self.lock:
+            return self.model
+
+    def status(self, job_id):
+        """Return a job's status, or None if it is unknown."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def list(self):
+        """Return the status of every retained job, newest first."""
+        with self.lock:
+            jobs = sorted(self.jobs.values(), key=lambda job: job.created, reverse=True)
+        return [job.to_dict() for job in jobs]
+
+    def cancel(self, job_id):
+        """Request cancellation; running jobs stop after their current batch."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status not in FINISHED:
+                job.cancel_requested.set()
+            return job.to_dict()
+
+    def prune(self):
+        finished = sorted((job for job in self.jobs.values() if job.status in FINISHED), key=lambda job: job.finished)
+        for job in finished[:max(len(self.jobs) - self.max_history, 0)]:
+            del self.jobs[job.id]
+
+    def shutdown(self, cancel=False):
+        """Stop accepting jobs, optionally cancelling those still queued or running."""
+        if cancel:
+            with self.lock:
+                for job in self.jobs.values():
+                    job.cancel_requested.set()
+        self.executor.shutdown(wait=True)
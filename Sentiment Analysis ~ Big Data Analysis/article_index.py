@@ -0,0 +1,373 @@
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from local_file_utils import LocalFileUtils
+from metrics import events, registry
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+QUERY_SECONDS = registry.histogram('article_index_query_seconds', 'Time to answer one index query.')
+INDEXED_DOCS = registry.counter('article_index_documents_total', 'Results added to the article index.')
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def document_text(result):
+    titles = ' '.join(article.get('title') or '' for article in result.get('articles', []))
+    return f"{titles} {result.get('scraped_text', '')}"
+
+def build_postings(terms, term_ids, docs):
+    order = sorted(range(len(terms)), key=terms.__getitem__)
+    ranks = np.empty(len(terms), dtype=np.int64)
+    ranks[order] = np.arange(len(terms))
+    pair_ranks = ranks[term_ids]
+    by_term = np.argsort(pair_ranks, kind='stable')
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pair_ranks, minlength=len(terms)), out=offsets[1:])
+    return [terms[i] for i in order], offsets, np.asarray(docs, dtype=np.int32)[by_term]
+
+def write_segment(path, keys, polarities, sentiments, timestamps, terms, offsets, docs):
+    os.makedirs(path)
+    np.save(os.path.join(path, 'ts.npy'), np.asarray(timestamps, dtype=np.float64))
+    np.save(os.path.join(path, 'offsets.npy'), offsets)
+    np.save(os.path.join(path, 'postings.npy'), docs)
+    np.save(os.path.join(path, 'polarity.npy'), np.asarray(polarities, dtype=np.float64))
+    np.save(os.path.join(path, 'sentiment.npy'), np.asarray(sentiments, dtype=np.int8))
+    with open(os.path.join(path, 'terms.json'), 'w', encoding='utf-8') as writer:
+        json.dump(terms, writer)
+    with open(os.path.join(path, 'keys.json'), 'w', encoding='utf-8') as writer:
+        json.dump(keys, writer)
+
+class IndexSegment:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, 'terms.json'), 'r', encoding='utf-8') as reader:
+            self.term_list = json.load(reader)
+        self.terms = {term: i for i, term in enumerate(self.term_list)}
+        with open(os.path.join(path, 'keys.json'), 'r', encoding='utf-8') as reader:
+            self.keys = json.load(reader)
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.postings = np.load(os.path.join(path, 'postings.npy'), mmap_mode='r')
+        self.polarity = np.load(os.path.join(path, 'polarity.npy'), mmap_mode='r')
+        self.sentiment = np.load(os.path.join(path, 'sentiment.npy'), mmap_mode='r')
+        # segments written before timestamps were kept lose to any stamped version of their keys
+        ts_path = os.path.join(path, 'ts.npy')
+        self.ts = np.load(ts_path, mmap_mode='r') if os.path.exists(ts_path) else np.zeros(len(self.keys))
+        self.live = np.ones(len(self.keys), dtype=bool)
+    def __len__(self):
+        return len(self.keys)
+    def docs(self, term):
+        i = self.terms.get(term)
+        if i is None:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+    def match(self, terms, codes, min_polarity, max_polarity):
+        if terms:
+            lists = sorted((self.docs(term) for term in terms), key=len)
+            docs = np.asarray(lists[0])
+            for other in lists[1:]:
+                if not len(docs):
+                    break
+                docs = np.intersect1d(docs, other, assume_unique=True)
+        else:
+            docs = np.arange(len(self.keys), dtype=np.int32)
+        if not len(docs):
+            return docs
+        polarity = self.polarity[docs]
+        mask = self.live[docs] & (polarity >= min_polarity) & (polarity <= max_polarity)
+        if codes is not None:
+            mask &= np.isin(self.sentiment[docs], codes)
+        return docs[mask]
+
+class ArticleIndex:
+    def __init__(self, base_dir='./news_articles/index', flush_docs=10000, merge_factor=10):
+        self.base_dir = base_dir
+        self.flush_docs = flush_docs
+        self.merge_factor = merge_factor
+        self.manifest_path = os.path.join(base_dir, 'index.json')
+        self.lock = threading.Lock()
+        self.segments = []
+        self.locations = {}
+        self.versions = {}
+        self.checkpoints = {}
+        self.next_segment = 1
+        self.reset_buffer()
+        os.makedirs(base_dir, exist_ok=True)
+        self.load()
+    def reset_buffer(self):
+        self.buffer_keys = []
+        self.buffer_positions = {}
+        self.buffer_polarities = []
+        self.buffer_sentiments = []
+        self.buffer_ts = []
+        self.buffer_terms = {}
+        self.buffer_term_ids = []
+        self.buffer_docs = []
+    def load(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as reader:
+                manifest = json.load(reader)
+            self.checkpoints = manifest.get('checkpoints', {})
+            self.next_segment = manifest['next_segment']
+            names = manifest['segments']
+        else:
+            names = []
+        for name in os.listdir(self.base_dir):
+            if name.startswith('segment-') and name not in names:
+                shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+        for name in names:
+            self.attach(IndexSegment(os.path.join(self.base_dir, name)))
+    def attach(self, segment):
+        for doc, key in enumerate(segment.keys):
+            previous = self.locations.get(key)
+            if previous is not None:
+                previous[0].live[previous[1]] = False
+            self.locations[key] = (segment, doc)
+            self.versions[key] = max(self.versions.get(key, 0.0), float(segment.ts[doc]))
+        self.segments.append(segment)
+    def save_manifest(self):
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as writer:
+            json.dump({'segments': [segment.name for segment in self.segments], 'next_segment': self.next_segment, 'checkpoints': self.checkpoints}, writer)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+    def add(self, key, result):
+        with self.lock:
+            self.add_locked(key, result)
+    def add_many(self, results):
+        with self.lock:
+            for result in results:
+                self.add_locked(result['phrase'], result)
+    def add_locked(self, key, result, ts=None):
+        # a record older than the indexed version of its key (e.g. from another writer's store) is dropped
+        ts = time.time() if ts is None else ts
+        if ts < self.versions.get(key, 0.0):
+            return False
+        self.versions[key] = ts
+        doc = self.buffer_positions.get(key)
+        if doc is not None:
+            self.buffer_keys[doc] = None
+        doc = self.buffer_positions[key] = len(self.buffer_keys)
+        self.buffer_keys.append(key)
+        self.buffer_polarities.append(result.get('polarity', 0.0))
+        self.buffer_sentiments.append(SENTIMENTS.index(result.get('sentiment', 'neutral')))
+        self.buffer_ts.append(ts)
+        terms = set(tokenize(document_text(result)))
+        self.buffer_term_ids.extend(self.buffer_terms.setdefault(term, len(self.buffer_terms)) for term in terms)
+        self.buffer_docs.extend([doc] * len(terms))
+        INDEXED_DOCS.inc()
+        return True
+    def pending(self):
+        return len(self.buffer_positions)
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+    def flush_locked(self):
+        if not self.buffer_positions:
+            return None
+        keep = np.array([key is not None for key in self.buffer_keys])
+        term_ids = np.asarray(self.buffer_term_ids, dtype=np.int64)
+        docs = np.asarray(self.buffer_docs, dtype=np.int64)
+        if not keep.all():
+            kept = keep[docs]
+            term_ids, docs = term_ids[kept], (np.cumsum(keep) - 1)[docs[kept]]
+        terms = list(self.buffer_terms)
+        keys = [key for key in self.buffer_keys if key is not None]
+        polarities = np.asarray(self.buffer_polarities, dtype=np.float64)[keep]
+        sentiments = np.asarray(self.buffer_sentiments, dtype=np.int8)[keep]
+        timestamps = np.asarray(self.buffer_ts, dtype=np.float64)[keep]
+        segment = self.write_new_segment(keys, polarities, sentiments, timestamps, *build_postings(terms, term_ids, docs))
+        self.attach(segment)
+        self.reset_buffer()
+        self.merge_tiers()
+        self.save_manifest()
+        return segment.name
+    def write_new_segment(self, keys, polarities, sentiments, timestamps, terms, offsets, docs):
+        name = f"segment-{self.next_segment:06d}"
+        self.next_segment += 1
+        path = os.path.join(self.base_dir, name)
+        write_segment(path, keys, polarities, sentiments, timestamps, terms, offsets, docs)
+        return IndexSegment(path)
+    def merge_tiers(self):
+        tiers = defaultdict(list)
+        for segment in self.segments:
+            tiers[int(math.log(max(int(segment.live.sum()), 1), self.merge_factor))].append(segment)
+        for tier, segments in sorted(tiers.items()):
+            if len(segments) >= self.merge_factor:
+                self.merge(segments)
+    def merge(self, segments):
+        keys, polarities, sentiments, timestamps = [], [], [], []
+        terms = {}
+        term_ids, docs = [], []
+        base = 0
+        for segment in segments:
+            live = segment.live.copy()
+            remap = np.cumsum(live) - 1 + base
+            ids = np.fromiter((terms.setdefault(term, len(terms)) for term in segment.term_list), dtype=np.int64, count=len(segment.term_list))
+            postings = np.asarray(segment.postings)
+            alive = live[postings]
+            term_ids.append(np.repeat(ids, np.diff(segment.offsets))[alive])
+            docs.append(remap[postings[alive]])
+            keys.extend(key for key, alive in zip(segment.keys, live) if alive)
+            polarities.append(np.asarray(segment.polarity)[live])
+            sentiments.append(np.asarray(segment.sentiment)[live])
+            timestamps.append(np.asarray(segment.ts)[live])
+            base += int(live.sum())
+        postings = build_postings(list(terms), np.concatenate(term_ids), np.concatenate(docs))
+        merged = self.write_new_segment(keys, np.concatenate(polarities), np.concatenate(sentiments), np.concatenate(timestamps), *postings)
+        merged_names = {segment.name for segment in segments}
+        self.segments = [segment for segment in self.segments if segment.name not in merged_names] + [merged]
+        for doc, key in enumerate(merged.keys):
+            self.locations[key] = (merged, doc)
+        self.save_manifest()
+        for segment in segments:
+            shutil.rmtree(segment.path, ignore_errors=True)
+        events.log('index_merged', "Merged {count} index segments into {name} ({docs} documents).", count=len(segments), name=merged.name, docs=len(merged))
+    def update_from_store(self, file_utils=None, filename='articles.json'):
+        file_utils = file_utils or LocalFileUtils()
+        added = 0
+        with self.lock:
+            checkpoints = self.checkpoints.setdefault(filename, {})
+            for record in file_utils.scan_since(filename, checkpoints):
+                if not self.add_locked(record['key'], record['value'], record['ts']):
+                    continue
+                added += 1
+                if self.pending() >= self.flush_docs:
+                    self.flush_locked()
+            self.flush_locked()
+            self.save_manifest()
+        events.log('index_updated', "Indexed {count} new results ({total} documents).", count=added, total=len(self))
+        return added
+    def __len__(self):
+        return len(self.locations)
+    def search(self, query='', sentiment=None, min_polarity=-1.0, max_polarity=1.0, limit=100):
+        with QUERY_SECONDS.time():
+            terms = list(dict.fromkeys(tokenize(query)))
+            codes = None
+            if sentiment:
+                names = [sentiment] if isinstance(sentiment, str) else sentiment
+                codes = np.array([SENTIMENTS.index(name) for name in names], dtype=np.int8)
+            with self.lock:
+                segments = list(self.segments)
+            total = 0
+            hits = []
+            for segment in reversed(segments):
+                docs = segment.match(terms, codes, min_polarity, max_polarity)
+                total += len(docs)
+                for doc in docs[::-1][:max(limit - len(hits), 0)]:
+                    hits.append({'phrase': segment.keys[doc], 'sentiment': SENTIMENTS[segment.sentiment[doc]], 'polarity': float(segment.polarity[doc])})
+            return {'total': total, 'hits': hits}
+    def close(self):
+        self.flush()
+
+class IndexSink:
+    def __init__(self, index=None, max_seconds=5.0):
+        self.index = index or ArticleIndex()
+        self.max_seconds = max_seconds
+        self.flushed_at = time.time()
+    def write_many(self, results):
+        self.index.add_many(results)
+    def checkpoint(self, force=False):
+        if force or self.index.pending() >= self.index.flush_docs or time.time() - self.flushed_at >= self.max_seconds:
+            self.index.flush()
+            self.flushed_at = time.time()
+        return not self.index.pending()
+    def close(self):
+        self.index.close()
+
+class IndexQueryHandler(BaseHTTPRequestHandler):
+    def send_json(self, code, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/search':
+            self.send_error(404)
+            return
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        try:
+            result = self.server.index.search(
+                params.get('q', ''),
+                sentiment=params['sentiment'].split(',') if params.get('sentiment') else None,
+                min_polarity=float(params.get('min_polarity', -1.0)),
+                max_polarity=float(params.get('max_polarity', 1.0)),
+                limit=int(params.get('limit', 100))
+            )
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(200, result)
+    def log_message(self, format, *args):
+        pass
+
+class IndexQueryServer:
+    def __init__(self, index, host='127.0.0.1', port=8009):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), IndexQueryHandler)
+        self.server.daemon_threads = True
+        self.server.index = self.index
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='index-query', daemon=True)
+        self.thread.start()
+        events.log('index_api_serving', "Serving index queries on {url}", url=f"http://{self.host}:{self.port}/search")
+        return self.port
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Maintain and query the inverted index over stored article results.')
+    parser.add_argument('--index-dir', default='./news_articles/index')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('update', help='index results written to the local store since the last update')
+    query = commands.add_parser('query', help='search indexed results')
+    query.add_argument('terms', nargs='*')
+    query.add_argument('--sentiment', choices=SENTIMENTS, action='append')
+    query.add_argument('--min-polarity', type=float, default=-1.0)
+    query.add_argument('--max-polarity', type=float, default=1.0)
+    query.add_argument('--limit', type=int, default=20)
+    serve = commands.add_parser('serve', help='keep the index updated and answer queries over HTTP')
+    serve.add_argument('--port', type=int, default=8009)
+    serve.add_argument('--interval', type=float, default=10.0, help='seconds between store updates')
+    args = parser.parse_args()
+    index = ArticleIndex(args.index_dir)
+    if args.command == 'update':
+        index.update_from_store()
+    elif args.command == 'query':
+        result = index.search(' '.join(args.terms), sentiment=args.sentiment, min_polarity=args.min_polarity, max_polarity=args.max_polarity, limit=args.limit)
+        print(f"{result['total']} matching results")
+        for hit in result['hits']:
+            print(f"{hit['polarity']:+.3f}  {hit['sentiment']:<8}  {hit['phrase']}")
+    else:
+        server = IndexQueryServer(index, port=args.port)
+        server.start()
+        try:
+            while True:
+                index.update_from_store()
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            index.close()
@@ -0,0 +1,55 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from message_codec import MessageCodec, FORMATS, COMPRESSIONS
+
+WORDS = ['market', 'climate', 'policy', 'growth', 'crisis', 'energy', 'record', 'rally', 'decline', 'election',
+         'vaccine', 'launch', 'report', 'strong', 'weak', 'surge', 'drop', 'investors', 'global', 'local']
+
+def synthetic_messages(count, articles_per_message=25, seed=7):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        phrase = ' '.join(rng.choice(WORDS) for _ in range(2))
+        articles = [{'title': ' '.join(rng.choice(WORDS) for _ in range(8)), 'url': f"https://news.example.com/{i}/{j}/{rng.randrange(10**8)}"} for j in range(articles_per_message)]
+        messages.append({'phrase': phrase, 'scraped_text': ' '.join(rng.choice(WORDS) for _ in range(80))[:500], 'articles': articles})
+    return messages
+
+def bench_codec(codec, messages, repeat):
+    encoded = [codec.encode(message) for message in messages]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            codec.encode(message)
+    encode_rate = len(messages) * repeat / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in encoded:
+            codec.decode(data)
+    decode_rate = len(messages) * repeat / (time.perf_counter() - start)
+    return encode_rate, decode_rate, sum(len(data) for data in encoded) / len(encoded)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare message codecs for the news_articles topic.')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--articles', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    messages = synthetic_messages(args.messages, args.articles)
+    print(f"{'format':<10}{'compression':<13}{'encode msg/s':>14}{'decode msg/s':>14}{'bytes/msg':>12}")
+    for format in FORMATS:
+        for compression in COMPRESSIONS:
+            try:
+                codec = MessageCodec(format, compression)
+            except ImportError as e:
+                print(f"{format:<10}{str(compression):<13}  skipped: {e}")
+                continue
+            encode_rate, decode_rate, size = bench_codec(codec, messages, args.repeat)
+            print(f"{format:<10}{str(compression):<13}{encode_rate:>14,.0f}{decode_rate:>14,.0f}{size:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+from collections import defaultdict
+import contextlib
+import io
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import types
+from urllib.parse import parse_qs, unquote, urlparse
+import zlib
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+WORDS = ['market', 'growth', 'strong', 'weak', 'crisis', 'record', 'rally', 'decline', 'great', 'terrible',
+         'good', 'bad', 'happy', 'sad', 'investors', 'policy', 'energy', 'climate', 'election', 'vaccine',
+         'not', 'very', 'really', 'surprisingly', 'report', 'says', 'the', 'a', 'of', 'in']
+
+class KafkaError:
+    _PARTITION_EOF = -191
+    def __init__(self, code, reason=''):
+        self._code = code
+        self.reason = reason
+    def code(self):
+        return self._code
+    def __str__(self):
+        return f"KafkaError({self._code}, {self.reason!r})"
+
+class TopicPartition:
+    def __init__(self, topic, partition=-1, offset=-1001):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+    def __repr__(self):
+        return f"TopicPartition({self.topic!r}, {self.partition}, {self.offset})"
+
+class FakeMessage:
+    def __init__(self, topic, partition, offset, key, value, produced_at):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self.produced_at = produced_at
+    def topic(self):
+        return self._topic
+    def partition(self):
+        return self._partition
+    def offset(self):
+        return self._offset
+    def key(self):
+        return self._key
+    def value(self):
+        return self._value
+    def error(self):
+        return None
+    def timestamp(self):
+        return (1, int(self.produced_at * 1000))
+
+class FakeBroker:
+    def __init__(self, partitions=6):
+        self.partitions = partitions
+        self.topics = defaultdict(lambda: [[] for _ in range(self.partitions)])
+        self.committed = {}
+        self.round_robin = itertools.count()
+        self.condition = threading.Condition()
+    def append(self, topic, key, value):
+        partition = zlib.crc32(key) % self.partitions if key is not None else next(self.round_robin) % self.partitions
+        with self.condition:
+            log = self.topics[topic][partition]
+            message = FakeMessage(topic, partition, len(log), key, value, time.time())
+            log.append(message)
+            self.condition.notify_all()
+        return message
+    def size(self, topic):
+        with self.condition:
+            return sum(len(log) for log in self.topics[topic])
+    def module(self):
+        module = types.ModuleType('confluent_kafka')
+        module.Producer = lambda config: FakeProducer(config, self)
+        module.Consumer = lambda config: FakeConsumer(config, self)
+        module.KafkaError = KafkaError
+        module.TopicPartition = TopicPartition
+        return module
+    def install(self):
+        sys.modules['confluent_kafka'] = self.module()
+
+class FakeProducer:
+    def __init__(self, config, broker):
+        self.broker = broker
+        self.linger = config.get('linger.ms', 5) / 1000
+        self.queue_limit = config.get('queue.buffering.max.messages', 100000)
+        self.queue = []
+        self.condition = threading.Condition()
+    def produce(self, topic, value=None, key=None, callback=None, on_delivery=None):
+        with self.condition:
+            if len(self.queue) >= self.queue_limit:
+                raise BufferError('Local: Queue full')
+            self.queue.append((time.time(), topic, key, value, callback or on_delivery))
+            self.condition.notify_all()
+    def deliver(self, timeout=0, force=False):
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                now = time.time()
+                due = len(self.queue) if force else sum(1 for entry in itertools.takewhile(lambda entry: now - entry[0] >= self.linger, self.queue))
+                if due or now >= deadline:
+                    break
+                self.condition.wait(min(deadline, self.queue[0][0] + self.linger if self.queue else deadline) - now)
+            batch, self.queue = self.queue[:due], self.queue[due:]
+        for _, topic, key, value, callback in batch:
+            message = self.broker.append(topic, key, value)
+            if callback:
+                callback(None, message)
+        return len(batch)
+    def poll(self, timeout=0):
+        return self.deliver(timeout)
+    def flush(self, timeout=None):
+        self.deliver(force=True)
+        return len(self)
+    def __len__(self):
+        return len(self.queue)
+
+class FakeConsumer:
+    def __init__(self, config, broker):
+        self.broker = broker
+        self.group = config.get('group.id')
+        self.auto_commit = config.get('enable.auto.commit', True)
+        self.positions = {}
+        self.fetched_at = {}
+        self.on_revoke = None
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        self.on_revoke = on_revoke
+        assignment = [TopicPartition(topic, partition) for topic in topics for partition in range(self.broker.partitions)]
+        with self.broker.condition:
+            for partition in assignment:
+                self.positions[(partition.topic, partition.partition)] = self.broker.committed.get((self.group, partition.topic, partition.partition), 0)
+        if on_assign:
+            on_assign(self, assignment)
+    def fetch(self, limit):
+        messages = []
+        for (topic, partition), position in self.positions.items():
+            taken = self.broker.topics[topic][partition][position:position + limit - len(messages)]
+            self.positions[(topic, partition)] = position + len(taken)
+            messages.extend(taken)
+            if len(messages) >= limit:
+                break
+        now = time.time()
+        for message in messages:
+            self.fetched_at[message.key()] = now
+        return messages
+    def consume(self, num_messages=1, timeout=-1):
+        deadline = time.time() + timeout if timeout >= 0 else None
+        messages = []
+        with self.broker.condition:
+            while True:
+                messages.extend(self.fetch(num_messages - len(messages)))
+                remaining = deadline - time.time() if deadline is not None else None
+                if len(messages) >= num_messages or (remaining is not None and remaining <= 0):
+                    return messages
+                self.broker.condition.wait(remaining)
+    def poll(self, timeout=None):
+        messages = self.consume(1, -1 if timeout is None else timeout)
+        return messages[0] if messages else None
+    def commit(self, message=None, offsets=None, asynchronous=True):
+        with self.broker.condition:
+            for partition in offsets or []:
+                self.broker.committed[(self.group, partition.topic, partition.partition)] = partition.offset
+    def get_watermark_offsets(self, partition, timeout=None, cached=False):
+        with self.broker.condition:
+            return 0, len(self.broker.topics[partition.topic][partition.partition])
+    def close(self):
+        if self.auto_commit:
+            self.commit(offsets=[TopicPartition(topic, partition, position) for (topic, partition), position in self.positions.items()])
+
+class FakeWebHdfs:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.files = {}
+        self.calls = 0
+        self.lock = threading.Lock()
+    def round_trip(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+    def status(self, path, strict=True):
+        self.round_trip()
+        with self.lock:
+            if path in self.files:
+                return {'length': len(self.files[path]), 'type': 'FILE'}
+            if any(name.startswith(path.rstrip('/') + '/') for name in self.files):
+                return {'length': 0, 'type': 'DIRECTORY'}
+        if strict:
+            raise IOError(f"File does not exist: {path}")
+        return None
+    def list(self, hdfs_path, status=False):
+        self.round_trip()
+        prefix = hdfs_path.rstrip('/') + '/'
+        with self.lock:
+            names = sorted({name[len(prefix):].split('/')[0] for name in self.files if name.startswith(prefix)})
+        return [(name, self.status(prefix + name)) for name in names] if status else names
+    @contextlib.contextmanager
+    def read(self, hdfs_path, offset=0, length=None, encoding=None, **kwargs):
+        self.round_trip()
+        with self.lock:
+            data = self.files[hdfs_path][offset:None if length is None else offset + length]
+        yield io.StringIO(data.decode(encoding)) if encoding else io.BytesIO(data)
+    def write(self, hdfs_path, data=None, overwrite=False, append=False, encoding=None, **kwargs):
+        self.round_trip()
+        if data is None:
+            return FakeHdfsWriter(self, hdfs_path, encoding)
+        payload = data.encode(encoding or 'utf-8') if isinstance(data, str) else data
+        with self.lock:
+            if append:
+                if hdfs_path not in self.files:
+                    raise IOError(f"File does not exist: {hdfs_path}")
+                self.files[hdfs_path] += payload
+            elif hdfs_path in self.files and not overwrite:
+                raise IOError(f"File already exists: {hdfs_path}")
+            else:
+                self.files[hdfs_path] = payload
+    def makedirs(self, hdfs_path, permission=None):
+        self.round_trip()
+    def delete(self, hdfs_path, recursive=False):
+        self.round_trip()
+        with self.lock:
+            return self.files.pop(hdfs_path, None) is not None
+    def rename(self, hdfs_src_path, hdfs_dst_path):
+        self.round_trip()
+        with self.lock:
+            self.files[hdfs_dst_path] = self.files.pop(hdfs_src_path)
+
+class FakeHdfsWriter:
+    def __init__(self, client, hdfs_path, encoding=None):
+        self.client = client
+        self.hdfs_path = hdfs_path
+        self.encoding = encoding
+        self.buffer = io.StringIO() if encoding else io.BytesIO()
+    def write(self, data):
+        return self.buffer.write(data)
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            data = self.buffer.getvalue()
+            with self.client.lock:
+                self.client.files[self.hdfs_path] = data.encode(self.encoding) if self.encoding else data
+
+class StubSourceAdapter(BaseAdapter):
+    def __init__(self, latency=0.0, articles=5, words=60):
+        super().__init__()
+        self.latency = latency
+        self.articles = articles
+        self.words = words
+        self.requests = 0
+        self.lock = threading.Lock()
+    def text(self, rng, words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words))
+    def payload(self, request):
+        url = urlparse(request.url)
+        query = parse_qs(url.query)
+        if 'wikipedia' in url.netloc:
+            phrase = unquote(url.path.rsplit('/', 1)[-1])
+        elif 'openai' in url.netloc:
+            phrase = json.loads(request.body)['prompt']
+        else:
+            phrase = (query.get('q') or query.get('query') or [''])[0]
+        rng = random.Random(zlib.crc32(f"{url.netloc}{phrase}".encode('utf-8')))
+        if 'newsapi' in url.netloc:
+            return {'status': 'ok', 'articles': [{'title': self.text(rng, 8), 'description': self.text(rng, self.words // 2), 'url': f"https://news.example.com/{rng.randrange(10**8)}"} for _ in range(self.articles)]}
+        if 'gdelt' in url.netloc:
+            return {'articles': [{'title': self.text(rng, 10), 'url': f"https://gdelt.example.com/{rng.randrange(10**8)}"} for _ in range(self.articles)]}
+        if 'wikipedia' in url.netloc:
+            return {'extract': self.text(rng, self.words)}
+        if 'themoviedb' in url.netloc:
+            return {'results': [{'id': rng.randrange(10**6), 'title': self.text(rng, 3), 'overview': self.text(rng, self.words // 2)} for _ in range(2)]}
+        return {'choices': [{'text': self.text(rng, self.words)}]}
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(self.payload(request)).encode('utf-8')
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+    def close(self):
+        pass
+    def mount(self, sources):
+        for session in sources.sessions.values():
+            session.mount('http://', self)
+            session.mount('https://', self)
+
+def synthetic_phrases(count, seed=3):
+    rng = random.Random(seed)
+    return [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}" for i in range(count)]
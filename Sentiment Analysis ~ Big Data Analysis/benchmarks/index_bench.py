@@ -0,0 +1,95 @@
+import argparse
+from itertools import accumulate
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_index import SENTIMENTS, ArticleIndex, document_text, tokenize
+
+def vocabulary(size, seed=5):
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+def synthetic_results(count, vocab, words=80, overwrite=0.05, seed=7):
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+    for i in range(count):
+        key = f"phrase {rng.randrange(i)}" if i and rng.random() < overwrite else f"phrase {i}"
+        text = rng.choices(vocab, cum_weights=cum_weights, k=words)
+        polarity = round(rng.uniform(-1, 1), 3)
+        yield {
+            'phrase': key,
+            'scraped_text': ' '.join(text[10:]),
+            'articles': [{'title': ' '.join(text[:10]), 'url': f"https://news.example.com/{i}"}],
+            'polarity': polarity,
+            'sentiment': 'positive' if polarity > 0 else 'negative' if polarity < 0 else 'neutral'
+        }
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def brute_force(latest, query, sentiment, low, high):
+    terms = set(tokenize(query))
+    return {key for key, result in latest.items() if terms <= set(tokenize(document_text(result))) and result['sentiment'] in sentiment and low <= result['polarity'] <= high}
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure article index build throughput and query latency.')
+    parser.add_argument('--docs', type=int, default=200000)
+    parser.add_argument('--vocab', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=500, help='results per add_many call, as the consumer sink sends them')
+    parser.add_argument('--flush-docs', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--check', type=int, default=0, help='verify this many queries against a brute-force scan')
+    args = parser.parse_args()
+    vocab = vocabulary(args.vocab)
+    workdir = tempfile.TemporaryDirectory(prefix='index-bench-')
+    index = ArticleIndex(os.path.join(workdir.name, 'index'), flush_docs=args.flush_docs)
+    results = list(synthetic_results(args.docs, vocab))
+    latest = {result['phrase']: result for result in results} if args.check else None
+    start = time.perf_counter()
+    for i in range(0, len(results), args.batch_size):
+        index.add_many(results[i:i + args.batch_size])
+        if index.pending() >= args.flush_docs:
+            index.flush()
+    index.close()
+    build = time.perf_counter() - start
+    reopen_start = time.perf_counter()
+    index = ArticleIndex(os.path.join(workdir.name, 'index'), flush_docs=args.flush_docs)
+    reopen = time.perf_counter() - reopen_start
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(index.base_dir) for name in names)
+    rng = random.Random(13)
+    queries = []
+    for _ in range(args.queries):
+        terms = ' '.join(rng.choice(vocab[:2000]) for _ in range(rng.randint(1, 2)))
+        sentiment = rng.sample(SENTIMENTS, rng.randint(1, 3))
+        low = round(rng.uniform(-1, 0.5), 2)
+        queries.append((terms, sentiment, low, round(low + rng.uniform(0.1, 1.0), 2)))
+    latencies = []
+    totals = []
+    for terms, sentiment, low, high in queries:
+        start = time.perf_counter()
+        result = index.search(terms, sentiment=sentiment, min_polarity=low, max_polarity=high, limit=20)
+        latencies.append(time.perf_counter() - start)
+        totals.append(result['total'])
+    mismatches = 0
+    for terms, sentiment, low, high in queries[:args.check]:
+        expected = brute_force(latest, terms, sentiment, low, high)
+        result = index.search(terms, sentiment=sentiment, min_polarity=low, max_polarity=high, limit=len(expected) + 1)
+        if result['total'] != len(expected) or {hit['phrase'] for hit in result['hits']} != expected:
+            mismatches += 1
+    print(f"{len(index)} documents in {len(index.segments)} segments, {size / 2**20:.1f} MB on disk")
+    print(f"build: {args.docs / build:,.0f} docs/s, reopen: {reopen * 1000:.0f} ms")
+    print(f"query: p50 {percentile(latencies, 50) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms, mean matches {sum(totals) / len(totals):,.0f}")
+    if args.check:
+        print(f"checked {min(args.check, len(queries))} queries against a full scan: {mismatches} mismatches")
+    workdir.cleanup()
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import contextlib
+import gc
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fakes import FakeBroker, FakeWebHdfs, StubSourceAdapter, WORDS, synthetic_phrases
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def memory_mb():
+    try:
+        with open('/proc/self/statm', 'r') as reader:
+            return int(reader.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def synthetic_messages(count, seed=9):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        phrase = f"bench {rng.choice(WORDS)} {i}"
+        articles = [{'title': ' '.join(rng.choice(WORDS) for _ in range(8)), 'url': f"https://news.example.com/{i}/{j}"} for j in range(5)]
+        messages.append({'phrase': phrase, 'scraped_text': ' '.join(rng.choice(WORDS) for _ in range(100))[:500], 'articles': articles})
+    return messages
+
+def measure(name, stage, trace_memory):
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    before = memory_mb()
+    start = time.perf_counter()
+    count, latencies = stage()
+    elapsed = time.perf_counter() - start
+    if trace_memory:
+        memory = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    else:
+        memory = memory_mb() - before
+    return name, count, count / elapsed if elapsed else 0.0, percentile(latencies, 50), percentile(latencies, 99), memory
+
+def fetch_stage(main, producer, phrases):
+    def run():
+        latencies = []
+        for phrase in phrases:
+            start = time.perf_counter()
+            main.fetch_news_and_produce(phrase, producer)
+            latencies.append(time.perf_counter() - start)
+        producer.flush()
+        return len(phrases), latencies
+    return run
+
+def produce_stage(producer, messages):
+    def run():
+        for message in messages:
+            producer.send_message('news_articles', message, key=message['phrase'])
+        producer.flush()
+        return len(messages), list(producer.latencies)
+    return run
+
+class LatencySink:
+    def __init__(self, consumer):
+        self.consumer = consumer
+        self.latencies = []
+    def write_many(self, results):
+        now = time.time()
+        self.latencies.extend(now - self.consumer.consumer.fetched_at[result['phrase'].encode('utf-8')] for result in results)
+    def checkpoint(self, force=False):
+        return True
+    def close(self):
+        pass
+
+def consume_stage(consumer, total, time_limit):
+    sink = LatencySink(consumer)
+    consumer.sinks.append(sink)
+    def run():
+        consumer.consume_messages(time_limit=time_limit, article_limit=total)
+        return len(sink.latencies), sink.latencies
+    return run
+
+def store_stage(file_utils, records, batch_size):
+    def run():
+        latencies = []
+        items = list(records.items())
+        for i in range(0, len(items), batch_size):
+            start = time.perf_counter()
+            file_utils.append_to_file('articles.json', dict(items[i:i + batch_size]))
+            latencies.append(time.perf_counter() - start)
+        return len(items), latencies
+    return run
+
+def lookup_stage(file_utils, keys):
+    def run():
+        latencies = []
+        for key in keys:
+            start = time.perf_counter()
+            file_utils.lookup('articles.json', key)
+            latencies.append(time.perf_counter() - start)
+        return len(keys), latencies
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure each pipeline stage against in-process Kafka, WebHDFS and news source stand-ins.')
+    parser.add_argument('--phrases', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=None, help='consumer batch size (default: main.consumer_batch_size)')
+    parser.add_argument('--engine', default=None, help='sentiment engine (default: main.consumer_sentiment_engine)')
+    parser.add_argument('--http-latency', type=float, default=0.005, help='seconds added to every stub source request')
+    parser.add_argument('--hdfs-latency', type=float, default=0.001, help='seconds added to every fake WebHDFS call')
+    parser.add_argument('--partitions', type=int, default=6)
+    parser.add_argument('--time-limit', type=float, default=600)
+    parser.add_argument('--trace-memory', action='store_true', help='report tracemalloc peaks instead of RSS growth (slower)')
+    parser.add_argument('--verbose', action='store_true', help='keep the pipeline\'s own output')
+    args = parser.parse_args()
+    broker = FakeBroker(args.partitions)
+    broker.install()
+    workdir = tempfile.TemporaryDirectory(prefix='pipeline-bench-')
+    os.chdir(workdir.name)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    rows = []
+    with output:
+        import main as pipeline
+        from kafka_consumer import NewsConsumer
+        from kafka_producer import NewsProducer
+        from local_file_utils import LocalFileUtils
+        from phrase_cache import PhraseCache
+        pipeline.hdfs_client = FakeWebHdfs(args.hdfs_latency)
+        pipeline.phrase_cache = PhraseCache(pipeline.hdfs_client, '/user/hadoop/news_data/')
+        pipeline.phrase_cache.warm()
+        StubSourceAdapter(args.http_latency).mount(pipeline.sources)
+        batch_size = args.batch_size or pipeline.consumer_batch_size
+        engine = args.engine or pipeline.consumer_sentiment_engine
+        phrases = synthetic_phrases(args.phrases)
+        messages = synthetic_messages(args.messages)
+        producer = NewsProducer(codec=pipeline.MessageCodec(pipeline.message_format, pipeline.message_compression), latency_window=max(args.messages, 1))
+        try:
+            rows.append(measure('fetch', fetch_stage(pipeline, producer, phrases), args.trace_memory))
+            rows.append(measure('fetch-cached', fetch_stage(pipeline, producer, phrases), args.trace_memory))
+            producer.latencies.clear()
+            rows.append(measure('produce', produce_stage(producer, messages), args.trace_memory))
+        finally:
+            producer.close()
+        total = broker.size('news_articles')
+        consumer = NewsConsumer('news_articles', 'bench_group', batch_size=batch_size, max_latency=pipeline.consumer_max_latency, codec=pipeline.MessageCodec(pipeline.message_format, pipeline.message_compression), sentiment_engine=engine)
+        rows.append(measure('consume', consume_stage(consumer, total, args.time_limit), args.trace_memory))
+        records = {message['phrase']: {**message, 'sentiment': 'neutral', 'polarity': 0.0} for message in messages}
+        file_utils = LocalFileUtils(base_dir='./store_bench/')
+        try:
+            rows.append(measure('store-append', store_stage(file_utils, records, batch_size), args.trace_memory))
+            rows.append(measure('store-lookup', lookup_stage(file_utils, list(records)), args.trace_memory))
+        finally:
+            file_utils.close()
+        pipeline.sources.close()
+    os.chdir('/')
+    workdir.cleanup()
+    print(f"consumer batch size {batch_size}, sentiment engine {engine}, {args.partitions} partitions")
+    print(f"{'stage':<14}{'msgs':>8}{'msg/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'mem MB':>10}")
+    for name, count, rate, p50, p99, memory in rows:
+        p50 = f"{p50 * 1000:.2f}" if p50 is not None else '-'
+        p99 = f"{p99 * 1000:.2f}" if p99 is not None else '-'
+        print(f"{name:<14}{count:>8}{rate:>12,.0f}{p50:>10}{p99:>10}{memory:>10.1f}")
+
+if __name__ == "__main__":
+    main()
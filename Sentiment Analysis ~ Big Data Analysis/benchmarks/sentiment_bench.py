@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from textblob import TextBlob
+from textblob.en import sentiment
+from sentiment_analyzer import VectorSentimentAnalyzer
+
+FILLERS = ['the', 'a', 'is', 'of', 'to', 'in', 'market', 'report', 'said', 'on', 'it', 'was', 'and', 'investors', 'policy',
+           'not', 'no', 'never', "isn't", "don't", 'very', 'really', 'extremely', '!', '.', ',', '...', '"', "'s", '(', ')']
+EMOTICONS = [':)', ':(', ': )', ':-D', '(!)', '( ! )', ';)']
+
+def synthetic_corpus(count, words_per_text=120, seed=11):
+    rng = random.Random(seed)
+    lexicon = sorted(sentiment.keys())
+    corpus = []
+    for _ in range(count):
+        words = [rng.choice(lexicon) if rng.random() < 0.3 else rng.choice(FILLERS) for _ in range(words_per_text)]
+        words = [word.capitalize() if rng.random() < 0.1 else word for word in words]
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(EMOTICONS))
+        corpus.append(' '.join(words))
+    return corpus
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as reader:
+        return [line.strip() for line in reader if line.strip()]
+
+def score_textblob(corpus, batch_size):
+    start = time.perf_counter()
+    scores = [TextBlob(text).sentiment.polarity for text in corpus]
+    return scores, time.perf_counter() - start
+
+def score_vector(corpus, batch_size):
+    analyzer = VectorSentimentAnalyzer(cache_size=0)
+    analyzer.polarity("warm up the lexicon")
+    start = time.perf_counter()
+    scores = []
+    for i in range(0, len(corpus), batch_size):
+        scores.extend(analyzer.score_texts(corpus[i:i + batch_size])[0].result())
+    return scores, time.perf_counter() - start
+
+def fastest(score, corpus, batch_size, repeat):
+    runs = [score(corpus, batch_size) for _ in range(max(repeat, 1))]
+    return runs[0][0], min(seconds for _, seconds in runs)
+
+def main():
+    parser = argparse.ArgumentParser(description='Check vectorized sentiment scoring against TextBlob and compare throughput.')
+    parser.add_argument('--corpus', help='text file with one document per line (default: synthetic news-like corpus)')
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    parser.add_argument('--repeat', type=int, default=3, help='time each engine this many times from a cold start and keep the fastest run')
+    args = parser.parse_args()
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.texts)
+    expected, textblob_seconds = fastest(score_textblob, corpus, args.batch_size, args.repeat)
+    actual, vector_seconds = fastest(score_vector, corpus, args.batch_size, args.repeat)
+    textblob_rate = len(corpus) / textblob_seconds
+    vector_rate = len(corpus) / vector_seconds
+    deviations = [abs(a - b) for a, b in zip(actual, expected)]
+    mismatches = sum(deviation > args.tolerance for deviation in deviations)
+    print(f"{'engine':<10}{'docs/s':>12}")
+    print(f"{'textblob':<10}{textblob_rate:>12,.0f}")
+    print(f"{'vector':<10}{vector_rate:>12,.0f}")
+    print(f"Speedup: {vector_rate / textblob_rate:.1f}x")
+    print(f"Parity: {len(corpus) - mismatches}/{len(corpus)} within {args.tolerance}, max deviation {max(deviations, default=0.0):.3g}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
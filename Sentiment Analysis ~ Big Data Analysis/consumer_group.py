@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import signal
+import time
+from kafka_consumer import NewsConsumer
+from metrics import MetricsServer, events
+
+def interrupt_once(signum, frame):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+def run_group_member(member_id, topic, group_id, time_limit, article_limit, consumer_options, telemetry):
+    signal.signal(signal.SIGINT, interrupt_once)
+    events.configure(telemetry['log_format'], telemetry['log_sample_rate'])
+    metrics_server = None
+    if telemetry['metrics_port'] is not None:
+        metrics_server = MetricsServer(port=telemetry['metrics_port'] + member_id)
+        metrics_server.start()
+    try:
+        consumer = NewsConsumer(topic, group_id, writer_id=member_id, **consumer_options)
+        consumer.consume_messages(time_limit=time_limit, article_limit=article_limit)
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+
+class ConsumerGroupRunner:
+    def __init__(self, topic, group_id, num_consumers, metrics_port=None, log_format='text', log_sample_rate=1.0, **consumer_options):
+        self.topic = topic
+        self.group_id = group_id
+        self.num_consumers = num_consumers
+        self.consumer_options = consumer_options
+        self.telemetry = {'metrics_port': metrics_port, 'log_format': log_format, 'log_sample_rate': log_sample_rate}
+        self.processes = []
+        self.context = multiprocessing.get_context('spawn')
+    def start(self, time_limit, article_limit):
+        for member_id in range(self.num_consumers):
+            process = self.context.Process(
+                target=run_group_member,
+                args=(member_id, self.topic, self.group_id, time_limit, article_limit, self.consumer_options, self.telemetry),
+                name=f"{self.group_id}-consumer-{member_id}"
+            )
+            process.start()
+            self.processes.append(process)
+        events.log('consumers_started', "Started {count} consumers in group '{group}'.", count=self.num_consumers, group=self.group_id)
+    def is_alive(self):
+        return any(process.is_alive() for process in self.processes)
+    def join(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        for process in self.processes:
+            process.join(None if deadline is None else max(0, deadline - time.time()))
+    def stop(self, timeout=30):
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+        self.join(timeout)
+        for process in self.processes:
+            if process.is_alive():
+                events.log('consumer_terminated', "Consumer {name} did not stop in time; terminating.", name=process.name)
+                process.terminate()
@@ -1,15 +1,167 @@
-from hdfs import InsecureClient
+from hdfs import InsecureClient, HdfsError
 import json
+import os
+import posixpath
+import threading
+import time
+from metrics import events
+
+LEASE_ERRORS = ('AlreadyBeingCreatedException', 'RecoveryInProgressException', 'FileAlreadyExistsException', 'LeaseExpiredException')
+
 class HadoopUtils:
-    def __init__(self, hdfs_url='http://localhost:9870', user=None):
+    def __init__(self, hdfs_url='http://localhost:9870', user=None, append_retries=8, compact_interval=60, compact_min_bytes=1024 * 1024):
         self.client = InsecureClient(hdfs_url, user=user)
+        self.append_retries = append_retries
+        self.compact_interval = compact_interval
+        self.compact_min_bytes = compact_min_bytes
+        self.appended = set()
+        self.compactor = None
+        self.stop_event = threading.Event()
     def write_to_hdfs(self, filename, data):
         with self.client.write(filename, encoding='utf-8') as writer:
             json.dump(data, writer)
     def read_from_hdfs(self, filename):
+        if self.client.status(f"{filename}.log", strict=False):
+            return self.read_appended(filename)
         with self.client.read(filename, encoding='utf-8') as reader:
             return json.load(reader)
+    def read_json(self, path, default=None):
+        if not self.client.status(path, strict=False):
+            return default
+        with self.client.read(path, encoding='utf-8') as reader:
+            return json.load(reader)
+    def read_log(self, filename, offset=0):
+        status = self.client.status(f"{filename}.log", strict=False)
+        if not status or status['length'] <= offset:
+            return
+        with self.client.read(f"{filename}.log", offset=offset, length=status['length'] - offset) as reader:
+            position = offset
+            for line in reader.read().splitlines(keepends=True):
+                if line.endswith(b'\n'):
+                    yield position, len(line), json.loads(line)
+                position += len(line)
     def append_to_hdfs(self, filename, data):
-        existing_data = self.read_from_hdfs(filename)
-        existing_data.update(data)
-        self.write_to_hdfs(filename, existing_data)
\ No newline at end of file
+        payload = ''.join(json.dumps({'key': key, 'ts': time.time(), 'value': value}) + '\n' for key, value in data.items())
+        log_path = f"{filename}.log"
+        for attempt in range(self.append_retries):
+            try:
+                if self.client.status(log_path, strict=False):
+                    self.client.write(log_path, data=payload, encoding='utf-8', append=True)
+                else:
+                    self.client.write(log_path, data=payload, encoding='utf-8', overwrite=False)
+                self.appended.add(filename)
+                if self.compact_interval:
+                    self.start_compactor()
+                return
+            except HdfsError as e:
+                if not any(name in str(e) for name in LEASE_ERRORS) or attempt == self.append_retries - 1:
+                    raise
+                time.sleep(min(2.0, 0.05 * 2 ** attempt))
+    def compacted_path(self, filename, kind, offset):
+        return f"{filename}.{kind}.{offset}.json"
+    def compacted_offsets(self, filename):
+        # each compaction writes its snapshot and index once, named by the log offset they cover
+        directory, name = posixpath.split(filename)
+        prefix = f"{name}.snapshot."
+        try:
+            names = self.client.list(directory or '.')
+        except HdfsError:
+            return []
+        offsets = []
+        for entry in names:
+            if entry.startswith(prefix) and entry.endswith('.json') and entry[len(prefix):-len('.json')].isdigit():
+                offsets.append(int(entry[len(prefix):-len('.json')]))
+        return sorted(offsets)
+    def read_compacted(self, filename, kind, offsets=None):
+        # the compactor keeps the previous version, so a reader that listed just before a compaction still finds one
+        for offset in reversed(self.compacted_offsets(filename) if offsets is None else offsets):
+            try:
+                data = self.read_json(self.compacted_path(filename, kind, offset))
+            except HdfsError:
+                data = None
+            if data is not None:
+                return data
+        return None
+    def read_appended(self, filename):
+        snapshot = self.read_compacted(filename, 'snapshot')
+        if snapshot is None:
+            data = self.read_json(filename, default={})
+            log_offset = 0
+        else:
+            data = snapshot['data']
+            log_offset = snapshot['log_offset']
+        for _, _, record in self.read_log(filename, log_offset):
+            data[record['key']] = record['value']
+        return data
+    def lookup_in_hdfs(self, filename, key, default=None):
+        index = self.read_compacted(filename, 'idx') or {'log_offset': 0, 'keys': {}}
+        value, found = default, False
+        if key in index['keys']:
+            offset, length = index['keys'][key]
+            with self.client.read(f"{filename}.log", offset=offset, length=length) as reader:
+                value, found = json.loads(reader.read())['value'], True
+        for _, _, record in self.read_log(filename, index['log_offset']):
+            if record['key'] == key:
+                value, found = record['value'], True
+        if not found:
+            snapshot = self.read_compacted(filename, 'snapshot')
+            base = snapshot['data'] if snapshot else self.read_json(filename, default={})
+            value = base.get(key, default)
+        return value
+    def publish(self, path, data):
+        # WebHDFS cannot rename over an existing file, so every version gets a fresh name and appears in a single rename
+        tmp_path = f"{path}.{os.getpid()}.{int(time.time() * 1000)}.tmp"
+        with self.client.write(tmp_path, encoding='utf-8', overwrite=True) as writer:
+            json.dump(data, writer)
+        try:
+            self.client.rename(tmp_path, path)
+        except HdfsError:
+            # another compactor already published this offset
+            self.client.delete(tmp_path)
+    def compact(self, filename):
+        offsets = self.compacted_offsets(filename)
+        snapshot = self.read_compacted(filename, 'snapshot', offsets)
+        index = self.read_compacted(filename, 'idx', offsets) or {'log_offset': 0, 'keys': {}}
+        if snapshot is None:
+            data, log_offset = self.read_json(filename, default={}), 0
+        else:
+            data, log_offset = snapshot['data'], snapshot['log_offset']
+        end = log_offset
+        for offset, length, record in self.read_log(filename, min(log_offset, index['log_offset'])):
+            if offset >= index['log_offset']:
+                index['keys'][record['key']] = [offset, length]
+            if offset >= log_offset:
+                data[record['key']] = record['value']
+            end = offset + length
+        if end <= log_offset:
+            return False
+        index['log_offset'] = end
+        # the index goes first: a listed snapshot always has its index next to it
+        self.publish(self.compacted_path(filename, 'idx', end), index)
+        self.publish(self.compacted_path(filename, 'snapshot', end), {'log_offset': end, 'data': data})
+        for offset in offsets[:-1]:
+            self.client.delete(self.compacted_path(filename, 'snapshot', offset))
+            self.client.delete(self.compacted_path(filename, 'idx', offset))
+        return True
+    def compaction_due(self, filename):
+        offsets = self.compacted_offsets(filename)
+        status = self.client.status(f"{filename}.log", strict=False)
+        return bool(status) and status['length'] - (offsets[-1] if offsets else 0) >= self.compact_min_bytes
+    def compaction_loop(self):
+        while not self.stop_event.wait(self.compact_interval):
+            for filename in list(self.appended):
+                try:
+                    if self.compaction_due(filename):
+                        self.compact(filename)
+                except Exception as e:
+                    events.log('hdfs_compaction_error', "Error compacting {filename}: {error}", filename=filename, error=e)
+    def start_compactor(self):
+        if self.compactor is None:
+            self.stop_event.clear()
+            self.compactor = threading.Thread(target=self.compaction_loop, name='hdfs-compactor', daemon=True)
+            self.compactor.start()
+    def stop_compactor(self):
+        self.stop_event.set()
+        if self.compactor:
+            self.compactor.join()
+            self.compactor = None
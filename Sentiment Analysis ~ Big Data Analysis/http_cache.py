@@ -0,0 +1,146 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_TTLS = {
+    'newsapi': 900,
+    'gdelt': 900,
+    'wikipedia': 86400,
+    'tmdb': 86400,
+    'openai': 86400
+}
+
+class CachedResponse:
+    def __init__(self, entry, from_cache):
+        self.status_code = entry['status_code']
+        self.text = entry['body']
+        self.headers = {'ETag': entry.get('etag'), 'Last-Modified': entry.get('last_modified')}
+        self.from_cache = from_cache
+    def json(self):
+        return json.loads(self.text)
+
+class ResponseCache:
+    def __init__(self, cache_dir=None, ttls=None, default_ttl=300, max_entries=1024, cacheable_statuses=(200, 404), max_disk_bytes=256 * 1024 * 1024, max_disk_age=7 * 86400, prune_every=256):
+        self.cache_dir = cache_dir
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.cacheable_statuses = cacheable_statuses
+        self.max_disk_bytes = max_disk_bytes
+        self.max_disk_age = max_disk_age
+        self.prune_every = prune_every
+        self.writes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.prune_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.prune()
+    def ttl(self, source):
+        return self.ttls.get(source, self.default_ttl)
+    def key(self, method, url, params=None, body=None, headers=None):
+        # headers such as X-Api-Key and Accept change the response, so they are part of the (hashed) key
+        headers = sorted((name.lower(), str(value)) for name, value in (headers or {}).items())
+        raw = json.dumps([method, url, sorted((params or {}).items()), body, headers], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as reader:
+                entry = json.load(reader)
+        except ValueError:
+            return None
+        self._remember(key, entry)
+        return entry
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if self.cache_dir:
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as writer:
+                json.dump(entry, writer)
+            os.replace(tmp_path, path)
+            with self.lock:
+                self.writes += 1
+                due = self.writes % self.prune_every == 0
+            if due:
+                self.prune()
+    def prune(self):
+        # drop files older than max_disk_age, then the least recently written until the directory fits max_disk_bytes
+        if not self.prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            now = time.time()
+            files = []
+            for entry in os.scandir(self.cache_dir):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.is_file():
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            for mtime, size, path in files:
+                if now - mtime < self.max_disk_age and total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            return removed
+        finally:
+            self.prune_lock.release()
+    def request(self, session, source, method, url, params=None, headers=None, json_body=None, timeout=None):
+        ttl = self.ttl(source)
+        if ttl <= 0:
+            response = session.request(method, url, params=params, headers=headers, json=json_body, timeout=timeout)
+            return CachedResponse(self._entry(response), from_cache=False)
+        key = self.key(method, url, params, json_body, headers)
+        entry = self.get(key)
+        now = time.time()
+        if entry is not None and now - entry['stored_at'] < ttl:
+            return CachedResponse(entry, from_cache=True)
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        response = session.request(method, url, params=params, headers=headers, json=json_body, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            entry = dict(entry, stored_at=now)
+            self.put(key, entry)
+            return CachedResponse(entry, from_cache=True)
+        entry = self._entry(response)
+        if response.status_code in self.cacheable_statuses:
+            self.put(key, entry)
+        return CachedResponse(entry, from_cache=False)
+    def _entry(self, response):
+        return {
+            'status_code': response.status_code,
+            'body': response.text,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time()
+        }
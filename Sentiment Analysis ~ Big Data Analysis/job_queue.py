@@ -0,0 +1,189 @@
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+from metrics import events, registry
+
+ACTIVE_STATES = ('queued', 'running')
+
+QUEUE_DEPTH = registry.gauge('phrase_queue_depth', 'Phrases waiting for a fetch worker.')
+JOBS = registry.counter('phrase_jobs_total', 'Phrase jobs finished, by final status.', ['status'])
+JOB_SECONDS = registry.histogram('phrase_job_seconds', 'Time a fetch worker spent on one phrase.')
+
+class PhraseQueue:
+    def __init__(self, handler, workers=4, max_pending=1000):
+        self.handler = handler
+        self.workers = workers
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.statuses = {}
+        self.pending = 0
+        self.accepting = True
+        self.condition = threading.Condition()
+        self.threads = []
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f'phrase-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+    def submit(self, phrase, block=True, timeout=None):
+        phrase = phrase.strip()
+        if not phrase:
+            return 'invalid'
+        with self.condition:
+            if not self.accepting:
+                return 'closed'
+            previous = self.statuses.get(phrase)
+            if previous is not None and previous['status'] in ACTIVE_STATES:
+                return 'duplicate'
+            job = self.statuses[phrase] = {'status': 'queued', 'submitted': time.time(), 'started': None, 'finished': None, 'error': None}
+            self.pending += 1
+        try:
+            self.jobs.put((phrase, job), block, timeout)
+        except queue.Full:
+            with self.condition:
+                if job['status'] == 'queued':
+                    job.update(status='rejected', finished=time.time())
+                    self.pending -= 1
+                    self.condition.notify_all()
+            return 'rejected'
+        except BaseException:
+            # interrupted while blocked on a full queue: the job was never enqueued, so forget it before re-raising
+            with self.condition:
+                if self.statuses.get(phrase) is job and job['status'] == 'queued':
+                    if previous is None:
+                        del self.statuses[phrase]
+                    else:
+                        self.statuses[phrase] = previous
+                    self.pending -= 1
+                    self.condition.notify_all()
+            raise
+        QUEUE_DEPTH.set(self.jobs.qsize())
+        return 'queued'
+    def submit_many(self, phrases, block=True, timeout=None):
+        results = Counter(self.submit(phrase, block, timeout) for phrase in phrases)
+        return dict(results)
+    def work(self):
+        while True:
+            item = self.jobs.get()
+            QUEUE_DEPTH.set(self.jobs.qsize())
+            if item is None:
+                return
+            phrase, job = item
+            with self.condition:
+                if job['status'] != 'queued':
+                    continue
+                job.update(status='running', started=time.time())
+            try:
+                with JOB_SECONDS.time():
+                    status, error = self.handler(phrase) or 'done', None
+            except Exception as e:
+                status, error = 'failed', str(e)
+            with self.condition:
+                job.update(status=status, finished=time.time(), error=error)
+                self.pending -= 1
+                self.condition.notify_all()
+            JOBS.inc(status=status)
+            if error:
+                events.log('phrase_failed', "Error processing phrase '{phrase}': {error}", phrase=phrase, error=error)
+            else:
+                events.log('phrase_finished', "Finished phrase '{phrase}': {status}", sampled=True, phrase=phrase, status=status)
+    def status(self, phrase):
+        with self.condition:
+            job = self.statuses.get(phrase)
+            return dict(job) if job else None
+    def counts(self):
+        with self.condition:
+            counts = Counter(job['status'] for job in self.statuses.values())
+        return {'pending': self.pending, **counts}
+    def drain(self, timeout=None):
+        with self.condition:
+            self.accepting = False
+            return self.condition.wait_for(lambda: self.pending == 0, timeout)
+    def cancel(self):
+        now = time.time()
+        with self.condition:
+            self.accepting = False
+            cancelled = 0
+            for job in self.statuses.values():
+                if job['status'] == 'queued':
+                    job.update(status='cancelled', finished=now)
+                    cancelled += 1
+            self.pending -= cancelled
+            self.condition.notify_all()
+        if cancelled:
+            JOBS.inc(cancelled, status='cancelled')
+        return cancelled
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+class PhraseApiHandler(BaseHTTPRequestHandler):
+    def send_json(self, code, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/phrases':
+            self.send_error(404)
+            return
+        phrases = parse_qs(url.query).get('phrase')
+        if not phrases:
+            self.send_json(200, self.server.jobs.counts())
+            return
+        self.send_json(200, {phrase: self.server.jobs.status(phrase) for phrase in phrases})
+    def do_POST(self):
+        if urlparse(self.path).path != '/phrases':
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8')
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                phrases = json.loads(body)
+            except ValueError:
+                self.send_json(400, {'error': 'Body is not valid JSON'})
+                return
+            phrases = phrases.get('phrases', []) if isinstance(phrases, dict) else phrases
+            if not isinstance(phrases, list) or not all(isinstance(phrase, str) for phrase in phrases):
+                self.send_json(400, {'error': 'Expected a list of phrases'})
+                return
+        else:
+            phrases = body.splitlines()
+        results = {phrase: self.server.jobs.submit(phrase, block=False) for phrase in dict.fromkeys(phrase.strip() for phrase in phrases) if phrase}
+        accepted = sum(1 for result in results.values() if result in ('queued', 'duplicate'))
+        self.send_json(202 if accepted == len(results) else 503, results)
+    def log_message(self, format, *args):
+        pass
+
+class PhraseApiServer:
+    def __init__(self, jobs, host='127.0.0.1', port=8008):
+        self.jobs = jobs
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), PhraseApiHandler)
+        self.server.daemon_threads = True
+        self.server.jobs = self.jobs
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='phrase-api', daemon=True)
+        self.thread.start()
+        events.log('phrase_api_serving', "Accepting phrases on {url}", url=f"http://{self.host}:{self.port}/phrases")
+        return self.port
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
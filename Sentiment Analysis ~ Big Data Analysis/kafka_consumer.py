@@ -1,69 +1,238 @@
-from confluent_kafka import Consumer, KafkaError
-import json
+from confluent_kafka import Consumer, KafkaError, TopicPartition
+import asyncio
+from collections import deque
+import math
 import time
-from sentiment_analyzer import SentimentAnalyzer
-from local_file_utils import LocalFileUtils
+from message_codec import MessageCodec
+from sentiment_analyzer import SENTIMENT_ENGINES, PooledSentimentAnalyzer
+from local_file_utils import LocalFileSink
+from metrics import events, registry
+
+CONSUMED = registry.counter('consumer_messages_total', 'Messages consumed, by outcome.', ['result'])
+CONSUMER_LAG = registry.gauge('consumer_lag', 'Messages between the committed position and the partition high watermark.', ['topic', 'partition'])
 
 class NewsConsumer:
-    def __init__(self, topic, group_id, bootstrap_servers='localhost:9092'):
+    def __init__(self, topic, group_id, bootstrap_servers='localhost:9092', batch_size=1, max_latency=1.0, scoring_workers=0, polarity_cache_path=None, codec=None, writer_id=None, sentiment_engine='textblob', sinks=None):
+        self.codec = codec or MessageCodec()
+        self.batch_size = batch_size
+        self.max_latency = max_latency
         self.consumer = Consumer({
             'bootstrap.servers': bootstrap_servers,
             'group.id': group_id,
-            'auto.offset.reset': 'earliest'
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False
         })
-        self.consumer.subscribe([topic])
-        self.sentiment_analyzer = SentimentAnalyzer()
-        self.file_utils = LocalFileUtils()
-    def consume_messages(self, time_limit, article_limit):
+        self.pending = None
+        self.ready = deque()
+        self.uncommitted = {}
+        self.failed = False
+        self.closed = False
+        self.consumer.subscribe([topic], on_assign=self.on_assign, on_revoke=self.on_revoke)
+        if scoring_workers > 0:
+            self.sentiment_analyzer = PooledSentimentAnalyzer(scoring_workers, cache_path=polarity_cache_path, engine=sentiment_engine)
+        else:
+            self.sentiment_analyzer = SENTIMENT_ENGINES[sentiment_engine](cache_path=polarity_cache_path)
+        self.sinks = [LocalFileSink(writer_id=writer_id)] if sinks is None else list(sinks)
+    def on_assign(self, consumer, partitions):
+        events.log('partitions_assigned', "Assigned partitions: {partitions}", partitions=[partition.partition for partition in partitions])
+    def on_revoke(self, consumer, partitions):
+        events.log('partitions_revoked', "Revoking partitions: {partitions}", partitions=[partition.partition for partition in partitions])
+        if self.pending:
+            pending, self.pending = self.pending, None
+            self.ready.extend(self.finish_batch(*pending, force=True))
+        elif self.uncommitted:
+            self.commit(force=True)
+    def parse_message(self, msg):
+        try:
+            message = self.codec.decode(msg.value())
+            return {
+                'phrase': message['phrase'],
+                'scraped_text': message['scraped_text'],
+                'articles': message.get('articles', [])
+            }
+        except ValueError:
+            events.log('decode_error', "Error decoding message: {value!r}", value=msg.value()[:200])
+        except Exception as e:
+            events.log('message_error', "Error processing message: {error}", error=e)
+        CONSUMED.inc(result='invalid')
+        return None
+    def build_result(self, message, polarity):
+        return {
+            'phrase': message['phrase'],
+            'scraped_text': message['scraped_text'],
+            'sentiment': self.sentiment_analyzer.categorize_sentiment(polarity),
+            'polarity': polarity,
+            'articles': message['articles']
+        }
+    def consume_messages(self, time_limit=None, article_limit=None):
+        count = 0
+        for _ in self.stream(time_limit, article_limit):
+            count += 1
+        return count
+    def __iter__(self):
+        return self.stream()
+    def __aiter__(self):
+        return self.astream()
+    async def astream(self, time_limit=None, article_limit=None):
+        loop = asyncio.get_running_loop()
+        results = self.stream(time_limit, article_limit)
+        done = object()
+        try:
+            while True:
+                result = await loop.run_in_executor(None, next, results, done)
+                if result is done:
+                    return
+                yield result
+        finally:
+            await loop.run_in_executor(None, results.close)
+    def stream(self, time_limit=None, article_limit=None):
+        time_limit = math.inf if time_limit is None else time_limit
+        article_limit = math.inf if article_limit is None else article_limit
+        if self.batch_size > 1:
+            return self.stream_batches(time_limit, article_limit)
+        return self.stream_messages(time_limit, article_limit)
+    def stream_messages(self, time_limit, article_limit):
         start_time = time.time()
         article_count = 0
         try:
             while True:
                 msg = self.consumer.poll(1.0)
                 if msg is None:
+                    if (time.time() - start_time) >= time_limit:
+                        break
                     continue
                 if msg.error():
                     if msg.error().code() == KafkaError._PARTITION_EOF:
                         continue
                     else:
-                        print(f"Consumer error: {msg.error()}")
+                        events.log('consumer_error', "Consumer error: {error}", error=msg.error())
                         break
+                message = self.parse_message(msg)
+                partition = (msg.topic(), msg.partition())
+                if message is None:
+                    self.uncommitted[partition] = msg.offset() + 1
+                    continue
                 try:
-                    message = json.loads(msg.value().decode('utf-8'))
                     phrase = message['phrase']
-                    scraped_text = message['scraped_text']
-                    articles = message.get('articles', [])
-                    if articles:
-                        print(f"Fetched articles for phrase '{phrase}':")
-                        for article in articles:
-                            print(f" - Title: {article['title']}, URL: {article['url']}")
-                    else:
-                        print(f"No articles found for phrase '{phrase}'.")
-                    polarity = self.sentiment_analyzer.analyze_sentiment(scraped_text)
-                    sentiment = self.sentiment_analyzer.categorize_sentiment(polarity)
-                    result = {
-                        'phrase': phrase,
-                        'scraped_text': scraped_text,
-                        'sentiment': sentiment,
-                        'polarity': polarity,
-                        'articles': articles
-                    }
-                    self.file_utils.append_to_file('articles.json', {phrase: result})
-                    print(f"Attempting to write to articles.json...")
-                    current_data = self.file_utils.read_from_file('articles.json')
-                    print(f"Current content of articles.json: {current_data}")
-
-                    print(f"Processed and stored result for phrase: {phrase}")
-                    print(f"Sentiment: {sentiment}, Polarity: {polarity}")
-                    article_count += 1
-                    if article_count >= article_limit or (time.time() - start_time) >= time_limit:
-                        print("Stopping consumption based on limits reached.")
-                        break
-                except json.JSONDecodeError:
-                    print(f"Error decoding message: {msg.value().decode('utf-8')}")
+                    events.log('message_received', "Fetched {articles} articles for phrase '{phrase}'", sampled=True, phrase=phrase, articles=len(message['articles']))
+                    polarity = self.sentiment_analyzer.analyze_sentiment(message['scraped_text'])
+                    result = self.build_result(message, polarity)
                 except Exception as e:
-                    print(f"Error processing message: {e}")
+                    events.log('message_error', "Error processing message: {error}", error=e)
+                    CONSUMED.inc(result='invalid')
+                    self.uncommitted[partition] = msg.offset() + 1
+                    continue
+                try:
+                    self.write_sinks([result])
+                except Exception as e:
+                    # stop without recording this offset, so no later commit can move past the unwritten result
+                    events.log('sink_error', "Error storing result for phrase {phrase}, stopping before its offset is committed: {error}", phrase=phrase, error=e)
+                    self.failed = True
+                    break
+                self.uncommitted[partition] = msg.offset() + 1
+                CONSUMED.inc(result='stored')
+                self.commit()
+                events.log('result_stored', "Processed and stored result for phrase: {phrase} (sentiment: {sentiment}, polarity: {polarity})", sampled=True, phrase=phrase, sentiment=result['sentiment'], polarity=polarity)
+                yield result
+                article_count += 1
+                if article_count >= article_limit or (time.time() - start_time) >= time_limit:
+                    events.log('consumer_stopped', "Stopping consumption based on limits reached.")
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+    def write_sinks(self, results):
+        for sink in self.sinks:
+            sink.write_many(results)
+    def collect_batch(self, msgs):
+        messages = []
+        offsets = {}
+        failed = False
+        for msg in msgs:
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    events.log('consumer_error', "Consumer error: {error}", error=msg.error())
+                    failed = True
+                continue
+            offsets[(msg.topic(), msg.partition())] = msg.offset() + 1
+            message = self.parse_message(msg)
+            if message is not None:
+                messages.append(message)
+        return messages, offsets, failed
+    def finish_batch(self, messages, offsets, scores, force=False):
+        results = []
+        if messages:
+            polarities = scores.result()
+            results = [self.build_result(message, polarity) for message, polarity in zip(messages, polarities)]
+            try:
+                self.write_sinks(results)
+            except Exception:
+                # batches fetched after this one must not be committed past it
+                self.failed = True
+                raise
+            CONSUMED.inc(len(messages), result='stored')
+            events.log('batch_stored', "Processed and stored batch of {count} results", sampled=True, count=len(messages))
+        self.uncommitted.update(offsets)
+        self.commit(force)
+        return results
+    def commit(self, force=False):
+        durable = [sink.checkpoint(force) for sink in self.sinks]
+        if not self.uncommitted or not all(durable):
+            return
+        offsets, self.uncommitted = self.uncommitted, {}
+        self.consumer.commit(offsets=[TopicPartition(topic, partition, offset) for (topic, partition), offset in offsets.items()], asynchronous=False)
+        self.record_lag(offsets)
+    def record_lag(self, offsets):
+        for (topic, partition), offset in offsets.items():
+            try:
+                low, high = self.consumer.get_watermark_offsets(TopicPartition(topic, partition), cached=True)
+            except Exception:
+                continue
+            if high >= 0:
+                CONSUMER_LAG.set(max(high - offset, 0), topic=topic, partition=partition)
+    def stream_batches(self, time_limit, article_limit):
+        start_time = time.time()
+        article_count = 0
+        self.pending = None
+        try:
+            while article_count < article_limit and (time.time() - start_time) < time_limit:
+                msgs = self.consumer.consume(num_messages=int(min(self.batch_size, article_limit - article_count)), timeout=self.max_latency)
+                messages, offsets, failed = self.collect_batch(msgs)
+                scores = self.sentiment_analyzer.submit_batch([message['scraped_text'] for message in messages]) if messages else None
+                article_count += len(messages)
+                previous, self.pending = self.pending, (messages, offsets, scores) if msgs else None
+                if previous:
+                    self.ready.extend(self.finish_batch(*previous))
+                elif self.uncommitted:
+                    self.commit()
+                while self.ready:
+                    yield self.ready.popleft()
+                if failed:
+                    break
+            events.log('consumer_stopped', "Stopping consumption based on limits reached ({count} results).", count=article_count)
+            if self.pending:
+                pending, self.pending = self.pending, None
+                self.ready.extend(self.finish_batch(*pending, force=True))
+            while self.ready:
+                yield self.ready.popleft()
         except KeyboardInterrupt:
             pass
+        finally:
+            self.close()
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            pending, self.pending = self.pending, None
+            if pending and not self.failed:
+                self.finish_batch(*pending, force=True)
+            elif self.uncommitted:
+                self.commit(force=True)
+            for sink in self.sinks:
+                sink.close()
         finally:
             self.consumer.close()
+            events.log('polarity_cache_stats', "Polarity cache: {stats}", stats=self.sentiment_analyzer.cache_stats())
+            self.sentiment_analyzer.close()
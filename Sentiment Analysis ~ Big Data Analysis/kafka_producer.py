@@ -1,17 +1,97 @@
 from confluent_kafka import Producer
-import json
+from collections import deque
+from message_codec import MessageCodec
+from metrics import events, registry
+import threading
+import time
+
+QUEUE_DEPTH = registry.gauge('producer_queue_depth', 'Messages waiting in the producer\'s local queue.')
+DELIVERIES = registry.counter('producer_messages_total', 'Messages acknowledged or rejected by the brokers.', ['result'])
+DELIVERY_SECONDS = registry.histogram('producer_delivery_seconds', 'Time from send_message to delivery acknowledgement.')
 
 class NewsProducer:
-    def __init__(self, bootstrap_servers='localhost:9092'):
-        self.producer = Producer({'bootstrap.servers': bootstrap_servers})
-    def delivery_report(self, err, msg):
+    def __init__(self, bootstrap_servers='localhost:9092', linger_ms=50, batch_size=131072, compression_type='lz4', metrics_hook=None, metrics_interval=10.0, latency_window=1000, codec=None):
+        self.producer = Producer({
+            'bootstrap.servers': bootstrap_servers,
+            'linger.ms': linger_ms,
+            'batch.size': batch_size,
+            'compression.type': compression_type
+        })
+        self.codec = codec or MessageCodec()
+        self.metrics_hook = metrics_hook
+        self.metrics_interval = metrics_interval
+        self.latencies = deque(maxlen=latency_window)
+        self.delivered = 0
+        self.failed = 0
+        self.stats_lock = threading.Lock()
+        self.running = True
+        self.poll_thread = threading.Thread(target=self.poll_loop, name='news-producer-poll', daemon=True)
+        self.poll_thread.start()
+    def poll_loop(self):
+        last_report = time.time()
+        while self.running:
+            self.producer.poll(0.1)
+            QUEUE_DEPTH.set(len(self.producer))
+            if self.metrics_hook and time.time() - last_report >= self.metrics_interval:
+                self.report_metrics()
+                last_report = time.time()
+    def delivery_report(self, err, msg, sent_at=None):
+        latency = time.time() - sent_at if sent_at is not None else None
+        with self.stats_lock:
+            if err is not None:
+                self.failed += 1
+            else:
+                self.delivered += 1
+                if latency is not None:
+                    self.latencies.append(latency)
+        DELIVERIES.inc(result='failed' if err is not None else 'delivered')
         if err is not None:
-            print(f'Message delivery failed: {err}')
-        else:
-            print(f'Message delivered to {msg.topic()} [{msg.partition()}]')
-    def send_message(self, topic, message):
+            events.log('delivery_failed', "Message delivery failed: {error}", error=err)
+        elif latency is not None:
+            DELIVERY_SECONDS.observe(latency)
+    def send_message(self, topic, message, key=None, retries=3):
+        sent_at = time.time()
+        payload = self.codec.encode(message)
+        for _ in range(retries):
+            try:
+                self.producer.produce(topic, payload, key=key.encode('utf-8') if isinstance(key, str) else key, callback=lambda err, msg: self.delivery_report(err, msg, sent_at))
+                return
+            except BufferError:
+                self.producer.poll(1.0)
+            except Exception as e:
+                events.log('send_error', "Error sending message to Kafka: {error}", topic=topic, error=e)
+                return
+        events.log('send_error', "Error sending message to Kafka: local queue still full after {retries} attempts", topic=topic, retries=retries)
+    def metrics(self):
+        with self.stats_lock:
+            latencies = sorted(self.latencies)
+            delivered, failed = self.delivered, self.failed
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+        return {
+            'queue_depth': len(self.producer),
+            'delivered': delivered,
+            'failed': failed,
+            'latency_p50': percentile(50),
+            'latency_p95': percentile(95),
+            'latency_p99': percentile(99)
+        }
+    def report_metrics(self):
         try:
-            self.producer.produce(topic, json.dumps(message).encode('utf-8'), callback=self.delivery_report)
-            self.producer.flush()
+            self.metrics_hook(self.metrics())
         except Exception as e:
-            print(f"Error sending message to Kafka: {e}")
\ No newline at end of file
+            events.log('metrics_hook_error', "Error in producer metrics hook: {error}", error=e)
+    def flush(self, timeout=30.0):
+        remaining = self.producer.flush(timeout)
+        if remaining:
+            events.log('flush_incomplete', "{remaining} messages still awaiting delivery after flush.", remaining=remaining)
+        return remaining
+    def close(self, timeout=30.0):
+        remaining = self.flush(timeout)
+        self.running = False
+        self.poll_thread.join()
+        if self.metrics_hook:
+            self.report_metrics()
+        return remaining
@@ -1,17 +1,73 @@
+from confluent_kafka import Consumer, KafkaError, TopicPartition
+import argparse
 from kafka_consumer import NewsConsumer
-from pyspark import SparkConf, SparkContext
-import os
+from message_codec import MessageCodec
+from metrics import events
+from parquet_sink import SCORED_SCHEMA, ParquetSink
 
-def save_to_hdfs(data, hdfs_path):
-    sc = SparkContext.getOrCreate()
-    rdd = sc.parallelize([data])
-    rdd.saveAsTextFile(hdfs_path)
+class HdfsArchiver:
+    def __init__(self, topic='news_articles', group_id='hdfs_group', hdfs_uri='hdfs:///user/news_data/', bootstrap_servers='localhost:9092', batch_size=500, max_latency=1.0, codec=None, **sink_options):
+        self.consumer = Consumer({
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': group_id,
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False
+        })
+        self.consumer.subscribe([topic], on_revoke=self.on_revoke)
+        self.codec = codec or MessageCodec()
+        self.sink = ParquetSink(hdfs_uri, **sink_options)
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.offsets = {}
+    def on_revoke(self, consumer, partitions):
+        self.roll()
+    def roll(self):
+        self.sink.checkpoint(force=True)
+        if self.offsets:
+            self.consumer.commit(offsets=[TopicPartition(topic, partition, offset) for (topic, partition), offset in self.offsets.items()], asynchronous=False)
+            self.offsets = {}
+    def store(self, msg):
+        try:
+            message = self.codec.decode(msg.value())
+            self.sink.write({
+                'phrase': message['phrase'],
+                'scraped_text': message['scraped_text'],
+                'articles': message.get('articles', []),
+                'timestamp': msg.timestamp()[1] if msg.timestamp()[1] > 0 else None
+            })
+        except Exception as e:
+            events.log('archive_error', "Error archiving message: {error}", error=e)
+        self.offsets[(msg.topic(), msg.partition())] = msg.offset() + 1
+    def run(self):
+        try:
+            while True:
+                for msg in self.consumer.consume(num_messages=self.batch_size, timeout=self.max_latency):
+                    if msg.error():
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            events.log('consumer_error', "Consumer error: {error}", error=msg.error())
+                        continue
+                    self.store(msg)
+                if self.sink.roll_due():
+                    self.roll()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.roll()
+            self.consumer.close()
 
 def consume_and_store_in_hdfs():
-    consumer = NewsConsumer('news_articles', 'hdfs_group')
-    hdfs_path = 'hdfs:///user/news_data/'
-    for message in consumer.consume_messages():
-        phrase = message['phrase']
-        scraped_text = message['scraped_text']
-        print(f"Saving to HDFS: {phrase}")
-        save_to_hdfs(scraped_text, hdfs_path + phrase)
+    HdfsArchiver('news_articles', 'hdfs_group', 'hdfs:///user/news_data/').run()
+
+def consume_scored_into_hdfs(hdfs_uri='hdfs:///user/news_scored/', time_limit=None, article_limit=None, batch_size=500, **consumer_options):
+    sink = ParquetSink(hdfs_uri, schema=SCORED_SCHEMA)
+    consumer = NewsConsumer('news_articles', 'hdfs_scored_group', batch_size=batch_size, sinks=[sink], **consumer_options)
+    return consumer.consume_messages(time_limit, article_limit)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Archive news messages from Kafka into Parquet on HDFS.')
+    parser.add_argument('--scored', action='store_true', help='score sentiment and archive results instead of raw messages')
+    args = parser.parse_args()
+    if args.scored:
+        consume_scored_into_hdfs()
+    else:
+        consume_and_store_in_hdfs()
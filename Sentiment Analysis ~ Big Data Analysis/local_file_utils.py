@@ -1,9 +1,14 @@
 import json
 import os
+import shutil
+from log_store import LogStore
 
 class LocalFileUtils:
-    def __init__(self, base_dir='./news_articles/'):
+    def __init__(self, base_dir='./news_articles/', writer_id=None):
         self.base_dir = base_dir
+        self.writer_id = writer_id
+        self.stores = {}
+        self.peers = {}
         os.makedirs(self.base_dir, exist_ok=True)
     def write_to_file(self, filename, data):
         full_path = os.path.join(self.base_dir, filename)
@@ -15,10 +20,94 @@ class LocalFileUtils:
             return {}
         with open(full_path, 'r', encoding='utf-8') as reader:
             return json.load(reader)
+    def get_store(self, filename):
+        name = os.path.splitext(filename)[0]
+        if name not in self.stores:
+            root = os.path.join(self.base_dir, name)
+            legacy_path = os.path.join(self.base_dir, filename)
+            # once any writer-* store exists the old JSON file lives only in writer-legacy, so readers never copy it again
+            grouped = self.writer_id is not None or bool(self.writer_dirs(root))
+            if grouped:
+                self.import_legacy(filename)
+            store = LogStore(root if self.writer_id is None else os.path.join(root, f"writer-{self.writer_id}"))
+            if not grouped and not len(store) and os.path.exists(legacy_path):
+                store.append_many(self.read_from_file(filename), ts=os.path.getmtime(legacy_path))
+            self.stores[name] = store
+        return self.stores[name]
+    def writer_dirs(self, root):
+        if not os.path.isdir(root):
+            return []
+        return sorted(name for name in os.listdir(root) if name.startswith('writer-'))
+    def import_legacy(self, filename):
+        # Group members share one read-only copy of the old JSON file, stamped with its mtime so newer writes win.
+        legacy_path = os.path.join(self.base_dir, filename)
+        root = os.path.join(self.base_dir, os.path.splitext(filename)[0])
+        target = os.path.join(root, 'writer-legacy')
+        if not os.path.exists(legacy_path) or os.path.exists(target):
+            return
+        if os.path.isdir(root) and any(name.startswith('segment-') for name in os.listdir(root)):
+            # a single-process store already holds the imported file
+            return
+        staging = os.path.join(os.path.dirname(target), f"legacy-import.{os.getpid()}.tmp")
+        store = LogStore(staging)
+        store.append_many(self.read_from_file(filename), ts=os.path.getmtime(legacy_path))
+        store.close()
+        try:
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+    def partition_stores(self, filename):
+        own = self.get_store(filename)
+        root = os.path.join(self.base_dir, os.path.splitext(filename)[0])
+        dirs = [root] + [os.path.join(root, name) for name in self.writer_dirs(root)]
+        stores = [own]
+        for path in dirs:
+            if os.path.abspath(path) == os.path.abspath(own.base_dir):
+                continue
+            if path in self.peers:
+                self.peers[path].refresh()
+            else:
+                self.peers[path] = LogStore(path, read_only=True)
+            stores.append(self.peers[path])
+        return stores
     def append_to_file(self, filename, data):
-        full_path = os.path.join(self.base_dir, filename)        
-        if not os.path.exists(full_path):
-            self.write_to_file(filename, {})
-        existing_data = self.read_from_file(filename)
-        existing_data.update(data)
-        self.write_to_file(filename, existing_data)
+        self.get_store(filename).append_many(data)
+    def lookup(self, filename, key, default=None):
+        latest = None
+        for store in self.partition_stores(filename):
+            ts = store.timestamp(key)
+            if ts is not None and (latest is None or ts > latest[0]):
+                latest = (ts, store)
+        return latest[1].get(key, default) if latest else default
+    def read_records(self, filename):
+        stores = self.partition_stores(filename)
+        if len(stores) == 1:
+            return stores[0].records()
+        return self.merged_records(stores)
+    def merged_records(self, stores):
+        owners = {}
+        for i, store in enumerate(stores):
+            for key, ts in store.entries():
+                if key not in owners or ts > owners[key][0]:
+                    owners[key] = (ts, i)
+        for i, store in enumerate(stores):
+            yield from store.records(keys={key for key, (_, owner) in owners.items() if owner == i})
+    def scan_since(self, filename, checkpoints):
+        root = os.path.abspath(os.path.join(self.base_dir, os.path.splitext(filename)[0]))
+        for store in self.partition_stores(filename):
+            name = os.path.relpath(os.path.abspath(store.base_dir), root)
+            yield from store.scan_since(checkpoints.setdefault(name, {}))
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+
+class LocalFileSink:
+    def __init__(self, file_utils=None, filename='articles.json', writer_id=None):
+        self.file_utils = file_utils or LocalFileUtils(writer_id=writer_id)
+        self.filename = filename
+    def write_many(self, results):
+        self.file_utils.append_to_file(self.filename, {result['phrase']: result for result in results})
+    def checkpoint(self, force=False):
+        return True
+    def close(self):
+        self.file_utils.close()
@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from metrics import events, registry
+
+APPEND_SECONDS = registry.histogram('log_store_append_seconds', 'Time to append and flush one batch of records.')
+APPENDED_RECORDS = registry.counter('log_store_records_total', 'Records appended to log store segments.')
+
+class LogStore:
+    def __init__(self, base_dir, segment_max_bytes=16 * 1024 * 1024, compact_after_segments=8, read_only=False):
+        self.base_dir = base_dir
+        self.read_only = read_only
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_after_segments = compact_after_segments
+        self.index = {}
+        self.lock = threading.Lock()
+        self.writer = None
+        if not read_only:
+            os.makedirs(self.base_dir, exist_ok=True)
+        self._load()
+    def _segment_path(self, segment):
+        return os.path.join(self.base_dir, segment)
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.base_dir) if name.startswith('segment-') and name.endswith('.jsonl'))
+    def _next_segment(self):
+        segments = self._segments()
+        last = int(segments[-1][len('segment-'):-len('.jsonl')]) if segments else 0
+        return f"segment-{last + 1:06d}.jsonl"
+    def _load(self):
+        index_path = os.path.join(self.base_dir, 'index.json')
+        indexed = {}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as reader:
+                    snapshot = json.load(reader)
+                indexed = {segment: tuple(entry) for segment, entry in snapshot['segments'].items()}
+                if all(self._segment_matches(segment, entry) for segment, entry in indexed.items()):
+                    self.index = {key: tuple(entry) for key, entry in snapshot['keys'].items()}
+                else:
+                    indexed = {}
+            except (ValueError, KeyError, TypeError) as e:
+                events.log('store_index_unreadable', "Ignoring unreadable index in {path}: {error}", path=self.base_dir, error=e)
+                indexed = {}
+        self.positions = {segment: (entry[1], entry[0]) for segment, entry in indexed.items()}
+        self._catch_up()
+        segments = self._segments()
+        self.active = segments[-1] if segments else self._next_segment()
+    def _catch_up(self):
+        segments = self._segments()
+        for segment in segments:
+            try:
+                stat = os.stat(self._segment_path(segment))
+            except FileNotFoundError:
+                continue
+            known, end = self.positions.get(segment, (None, 0))
+            if known != stat.st_ino:
+                end = 0
+            if end >= stat.st_size:
+                self.positions[segment] = (stat.st_ino, end)
+                continue
+            try:
+                for offset, length, record in self._scan_segment(segment, end):
+                    current = self.index.get(record['key'])
+                    if current is None or record['ts'] >= current[3]:
+                        self.index[record['key']] = (segment, offset, length, record['ts'])
+                    end = offset + length
+            except FileNotFoundError:
+                continue
+            self.positions[segment] = (stat.st_ino, end)
+        gone = set(self.positions) - set(segments)
+        if gone:
+            # Compaction rewrote the survivors into a newer inode, which was rescanned above.
+            for segment in gone:
+                del self.positions[segment]
+            self.index = {key: entry for key, entry in self.index.items() if entry[0] not in gone}
+    def refresh(self):
+        with self.lock:
+            self._catch_up()
+    def _segment_matches(self, segment, entry):
+        path = self._segment_path(segment)
+        if not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        return stat.st_size >= entry[0] and stat.st_ino == entry[1]
+    def _scan_segment(self, segment, start=0):
+        with open(self._segment_path(segment), 'rb') as reader:
+            reader.seek(start)
+            offset = start
+            for line in reader:
+                length = len(line)
+                if line.endswith(b'\n'):
+                    try:
+                        yield offset, length, json.loads(line)
+                    except ValueError:
+                        events.log('store_corrupt_record', "Skipping corrupt record in {segment} at offset {offset}", segment=segment, offset=offset)
+                offset += length
+    def _open_writer(self):
+        if self.writer is None:
+            self.writer = open(self._segment_path(self.active), 'ab')
+        return self.writer
+    def _roll(self):
+        self.writer.close()
+        self.writer = None
+        self.active = self._next_segment()
+        if len(self._segments()) >= self.compact_after_segments:
+            self._compact()
+    def _write(self, key, value, ts):
+        writer = self._open_writer()
+        line = (json.dumps({'key': key, 'ts': ts, 'value': value}) + '\n').encode('utf-8')
+        offset = writer.tell()
+        writer.write(line)
+        return self.active, offset, len(line)
+    def append(self, key, value):
+        self.append_many({key: value})
+    def append_many(self, records, ts=None):
+        if not records:
+            return
+        if self.read_only:
+            raise IOError(f"Log store {self.base_dir} is open read-only")
+        with APPEND_SECONDS.time(), self.lock:
+            ts = time.time() if ts is None else ts
+            for key, value in records.items():
+                segment, offset, length = self._write(key, value, ts)
+                self.index[key] = (segment, offset, length, ts)
+            self.writer.flush()
+            if self.writer.tell() >= self.segment_max_bytes:
+                self._roll()
+        APPENDED_RECORDS.inc(len(records))
+    def _read_at(self, segment, offset, length):
+        with open(self._segment_path(segment), 'rb') as reader:
+            reader.seek(offset)
+            return json.loads(reader.read(length))
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return default
+            return self._read_at(*entry[:3])['value']
+    def __contains__(self, key):
+        return key in self.index
+    def __len__(self):
+        return len(self.index)
+    def keys(self):
+        return list(self.index)
+    def timestamp(self, key):
+        entry = self.index.get(key)
+        return entry[3] if entry else None
+    def entries(self):
+        with self.lock:
+            return [(key, entry[3]) for key, entry in self.index.items()]
+    def records(self, keys=None):
+        with self.lock:
+            live = sorted(((key, entry) for key, entry in self.index.items() if keys is None or key in keys), key=lambda item: item[1][:2])
+        current, reader = None, None
+        try:
+            for key, (segment, offset, length, ts) in live:
+                if segment != current:
+                    if reader:
+                        reader.close()
+                    current, reader = segment, open(self._segment_path(segment), 'rb')
+                reader.seek(offset)
+                yield key, json.loads(reader.read(length))['value']
+        finally:
+            if reader:
+                reader.close()
+    def scan_since(self, checkpoint):
+        positions = checkpoint.setdefault('segments', {})
+        watermark = checkpoint.get('ts', 0)
+        segments = self._segments()
+        for segment in segments:
+            try:
+                inode = os.stat(self._segment_path(segment)).st_ino
+            except FileNotFoundError:
+                continue
+            known = positions.get(segment)
+            start = known[1] if known and known[0] == inode else 0
+            try:
+                for offset, length, record in self._scan_segment(segment, start):
+                    positions[segment] = [inode, offset + length]
+                    if start == 0 and record['ts'] <= watermark:
+                        continue
+                    checkpoint['ts'] = max(checkpoint.get('ts', 0), record['ts'])
+                    yield record
+            except FileNotFoundError:
+                continue
+        for segment in list(positions):
+            if segment not in segments:
+                del positions[segment]
+    def compact(self):
+        with self.lock:
+            self._compact()
+    def _compact(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        sealed = [segment for segment in self._segments() if segment != self.active]
+        if not sealed:
+            return
+        compacted = sealed[-1] + '.compacting'
+        live = sorted(((key, entry) for key, entry in self.index.items() if entry[0] in sealed), key=lambda item: item[1][:2])
+        with open(self._segment_path(compacted), 'wb') as writer:
+            moved = {}
+            for key, (segment, offset, length, ts) in live:
+                with open(self._segment_path(segment), 'rb') as reader:
+                    reader.seek(offset)
+                    line = reader.read(length)
+                moved[key] = (sealed[-1], writer.tell(), length, ts)
+                writer.write(line)
+            writer.flush()
+            os.fsync(writer.fileno())
+        os.replace(self._segment_path(compacted), self._segment_path(sealed[-1]))
+        self.index.update(moved)
+        for segment in sealed[:-1]:
+            os.remove(self._segment_path(segment))
+        self._write_index()
+    def _write_index(self):
+        index_path = os.path.join(self.base_dir, 'index.json')
+        segments = {}
+        for segment in self._segments():
+            stat = os.stat(self._segment_path(segment))
+            segments[segment] = (stat.st_size, stat.st_ino)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as writer:
+            json.dump({'segments': segments, 'keys': self.index}, writer)
+        os.replace(index_path + '.tmp', index_path)
+    def close(self):
+        if self.read_only:
+            return
+        with self.lock:
+            if self.writer:
+                self.writer.close()
+                self.writer = None
+            self._write_index()
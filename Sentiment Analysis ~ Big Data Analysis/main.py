@@ -1,150 +1,152 @@
-import threading
-from newsapi import NewsApiClient
 from kafka_producer import NewsProducer
-from kafka_consumer import NewsConsumer
+from consumer_group import ConsumerGroupRunner
+from news_sources import NewsSources
+from http_cache import ResponseCache
+from message_codec import MessageCodec
+from phrase_cache import PhraseCache
+from metrics import MetricsServer, events, registry
+from job_queue import PhraseApiServer, PhraseQueue
 from hdfs import InsecureClient
-import time
-import requests
+import argparse
 import json
+import sys
+import threading
 
-newsapi = NewsApiClient(api_key='')
+newsapi_key = ''
 gdelt_base_url = ''
 wikipedia_api_url = ''
 hdfs_client = InsecureClient('http://localhost:9870', user='hadoop')
+phrase_cache = PhraseCache(hdfs_client, '/user/hadoop/news_data/')
 tmdb_api_key = ''
 tmdb_access_token = ''
 openai_api_key = ''
+consumer_processes = 6
+consumer_batch_size = 100
+consumer_max_latency = 1.0
+consumer_scoring_workers = 0
+consumer_sentiment_engine = 'vector'
+consumer_time_limit = 120
+consumer_article_limit = 100
+fetch_workers = 4
+phrase_queue_size = 1000
+polarity_cache_path = './news_articles/polarity_cache.json'
+message_format = 'json'
+message_compression = None
+metrics_port = 9108
+log_format = 'text'
+log_sample_rate = 1.0
+response_cache = ResponseCache(cache_dir='./news_articles/http_cache')
+sources = NewsSources(newsapi_key=newsapi_key, tmdb_api_key=tmdb_api_key, openai_api_key=openai_api_key, base_urls={'gdelt': gdelt_base_url, 'wikipedia': wikipedia_api_url}, cache=response_cache)
 
 def fetch_news_and_produce(phrase, producer):
-    hdfs_path = f'/user/hadoop/news_data/{phrase.replace(" ", "_")}.json'
-    scraped_text = ""
-    articles = []
-    start_time = time.time()
+    hdfs_path = phrase_cache.path_for(phrase)
     try:
-        if hdfs_client.status(hdfs_path, strict=False):
-            with hdfs_client.read(hdfs_path) as reader:
-                existing_data = json.loads(reader.read())
-                print(f"Data found in HDFS for phrase '{phrase}': {existing_data}")
-                return
+        if phrase_cache.exists(hdfs_path):
+            events.log('phrase_cached', "Data found in HDFS for phrase '{phrase}', skipping fetch.", sampled=True, phrase=phrase)
+            return 'cached'
     except Exception as e:
-        print(f"Error checking HDFS for phrase '{phrase}': {e}")
-    try:
-        print(f"Fetching news articles for '{phrase}' from NewsAPI...")
-        articles_response = newsapi.get_everything(q=phrase, language='en', sort_by='relevancy', page_size=5)
-        if articles_response['status'] == 'ok':
-            for article in articles_response['articles']:
-                title = article['title']
-                description = article['description']
-                url = article['url']
-                scraped_text += f"{title} {description} "
-                articles.append({'title': title, 'url': url})
-        else:
-            print(f"No articles found on NewsAPI for '{phrase}'.")
-    except Exception as e:
-        print(f"Error fetching from NewsAPI: {e}")
-    try:
-        print(f"Fetching data for '{phrase}' from GDELT...")
-        gdelt_url = f"https://api.gdeltproject.org/api/v2/doc/doc?query={phrase}&mode=artlist&format=json"
-        gdelt_response = requests.get(gdelt_url)
-        gdelt_data = gdelt_response.json()
-        if 'articles' in gdelt_data:
-            for article in gdelt_data['articles']:
-                title = article['title']
-                url = article['url']
-                scraped_text += f"{title} "
-                articles.append({'title': title, 'url': url})
-        else:
-            print(f"No data found on GDELT for '{phrase}'.")
-    except Exception as e:
-        print(f"Error fetching from GDELT: {e}")
-    try:
-        print(f"Fetching data for '{phrase}' from Wikipedia...")
-        wikipedia_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{phrase.replace(' ', '%20')}"
-        page_count = 0
-        while time.time() - start_time < 180 and page_count < 5:
-            wikipedia_response = requests.get(wikipedia_url, timeout=10)
-            if wikipedia_response.status_code == 200:
-                wikipedia_data = wikipedia_response.json()
-                scraped_text += wikipedia_data.get('extract', '')
-                page_count += 1
-            else:
-                print(f"No Wikipedia page found for '{phrase}'.")
-                break
-    except requests.exceptions.Timeout:
-        print("Wikipedia fetching timed out.")
-    except Exception as e:
-        print(f"Error fetching from Wikipedia: {e}")
-    try:
-        print(f"Fetching movie information for '{phrase}' from TMDb...")
-        tmdb_url = f"https://api.themoviedb.org/3/search/movie?api_key={tmdb_api_key}&query={phrase}"
-        tmdb_response = requests.get(tmdb_url, timeout=10)
-        tmdb_data = tmdb_response.json()
-        if 'results' in tmdb_data and tmdb_data['results']:
-            for movie in tmdb_data['results']:
-                title = movie['title']
-                overview = movie['overview']
-                scraped_text += f"Movie: {title} Overview: {overview} "
-                articles.append({'title': title, 'url': f"https://www.themoviedb.org/movie/{movie['id']}"})
-        else:
-            print(f"No movie data found on TMDb for '{phrase}'.")
-    except requests.exceptions.Timeout:
-        print(f"TMDb fetching timed out after 10 seconds.")
-    try:
-        print(f"Fetching OpenAI-generated text for '{phrase}'...")
-        headers = {
-            'Authorization': f'Bearer {openai_api_key}',
-            'Content-Type': 'application/json',
-        }
-        openai_data = {
-            "model": "text-davinci-003",
-            "prompt": f"Generate a short description about '{phrase}'",
-            "max_tokens": 150,
-        }
-        openai_response = requests.post('https://api.openai.com/v1/completions', headers=headers, json=openai_data)
-        openai_text = openai_response.json().get('choices', [{}])[0].get('text', '')
-        if openai_text:
-            scraped_text += f"OpenAI Summary: {openai_text}"
-        else:
-            print(f"No OpenAI-generated text for '{phrase}'.")
-    except Exception as e:
-        print(f"Error fetching from OpenAI: {e}")
+        events.log('hdfs_check_error', "Error checking HDFS for phrase '{phrase}': {error}", phrase=phrase, error=e)
+    scraped_text, articles = sources.fetch_all(phrase)
     if scraped_text:
         message = {
             'phrase': phrase,
             'scraped_text': scraped_text[:500],
             'articles': articles
         }
-        producer.send_message('news_articles', message)
-        print(f"Sent data for phrase: {phrase}")
+        producer.send_message('news_articles', message, key=phrase)
+        events.log('phrase_sent', "Sent data for phrase: {phrase}", sampled=True, phrase=phrase)
         try:
             with hdfs_client.write(hdfs_path, overwrite=True) as writer:
                 writer.write(json.dumps(message).encode('utf-8'))
-            print(f"Stored data for phrase '{phrase}' in HDFS.")
+            phrase_cache.mark_written(hdfs_path)
+            events.log('phrase_stored', "Stored data for phrase '{phrase}' in HDFS.", sampled=True, phrase=phrase)
         except Exception as e:
-            print(f"Error writing to HDFS: {e}")
-    else:
-        print(f"No data found for phrase '{phrase}' across all APIs.")
-def run_consumer():
-    consumer = NewsConsumer('news_articles', 'news_group')
-    consumer.consume_messages(time_limit=120, article_limit=100)
+            events.log('hdfs_write_error', "Error writing to HDFS: {error}", phrase=phrase, error=e)
+        return 'sent'
+    events.log('phrase_empty', "No data found for phrase '{phrase}' across all APIs.", sampled=True, phrase=phrase)
+    return 'empty'
+def report_producer_metrics(metrics):
+    events.log('producer_metrics', "Producer metrics: {metrics}", metrics=metrics)
+def start_consumers(time_limit=consumer_time_limit, article_limit=consumer_article_limit):
+    consumer_group = ConsumerGroupRunner('news_articles', 'news_group', consumer_processes, batch_size=consumer_batch_size, max_latency=consumer_max_latency, scoring_workers=consumer_scoring_workers, sentiment_engine=consumer_sentiment_engine, polarity_cache_path=polarity_cache_path, codec=MessageCodec(message_format, message_compression), metrics_port=metrics_port + 1 if metrics_port is not None else None, log_format=log_format, log_sample_rate=log_sample_rate)
+    consumer_group.start(time_limit=time_limit, article_limit=article_limit)
+    return consumer_group
+def read_phrases(reader):
+    for line in reader:
+        phrase = line.strip()
+        if phrase and not phrase.startswith('#'):
+            yield phrase
+def drain_jobs(jobs):
+    print(f"Finishing {jobs.pending} queued phrases (Ctrl+C to cancel the rest)...")
+    try:
+        jobs.drain()
+    except KeyboardInterrupt:
+        print(f"Cancelled {jobs.cancel()} queued phrases; waiting for running fetches...")
+        jobs.drain()
+    jobs.close()
+    events.log('phrase_jobs_drained', "Phrase jobs: {counts}", counts=jobs.counts())
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fetch news for phrases, stream them through Kafka and score their sentiment.')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--file', help='read phrases from a file, one per line')
+    source.add_argument('--stdin', action='store_true', help='read phrases from standard input, one per line')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='accept phrases over a local HTTP API until interrupted')
+    parser.add_argument('--workers', type=int, default=fetch_workers, help='concurrent fetch workers')
+    parser.add_argument('--queue-size', type=int, default=phrase_queue_size, help='phrases that may wait for a worker before submissions block')
+    parser.add_argument('--consumer-time-limit', type=float, default=consumer_time_limit)
+    parser.add_argument('--consumer-article-limit', type=int, default=consumer_article_limit)
+    return parser.parse_args()
 if __name__ == "__main__":
-    producer = NewsProducer()
-    consumer_thread = threading.Thread(target=run_consumer)
-    consumer_thread.start()
-    print("Sentiment Analysis Tool")
+    args = parse_args()
+    events.configure(log_format, log_sample_rate)
+    metrics_server = MetricsServer(registry, port=metrics_port) if metrics_port is not None else None
+    if metrics_server:
+        metrics_server.start()
+    try:
+        phrase_cache.warm()
+    except Exception as e:
+        events.log('phrase_cache_warm_error', "Error warming HDFS phrase cache: {error}", error=e)
+    consumer_group = start_consumers(args.consumer_time_limit, args.consumer_article_limit)
+    producer = NewsProducer(metrics_hook=report_producer_metrics, codec=MessageCodec(message_format, message_compression))
+    jobs = PhraseQueue(lambda phrase: fetch_news_and_produce(phrase, producer), workers=args.workers, max_pending=args.queue_size).start()
+    api_server = PhraseApiServer(jobs, port=args.serve) if args.serve is not None else None
+    interactive = not (args.file or args.stdin or api_server)
     try:
-        while True:
-            phrase = input("\nEnter a phrase to analyze (or 'q' to exit): ").strip()
-            if phrase.lower() == 'q':
-                break
-            if phrase:
-                fetch_news_and_produce(phrase, producer)
-                print("Waiting for data to be processed...\n")
-                consumer_thread.join(timeout=5)
-            else:
-                print("Please enter a non-empty phrase.")
+        if api_server:
+            api_server.start()
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8') as reader:
+                events.log('phrases_submitted', "Queued phrases from {path}: {results}", path=args.file, results=jobs.submit_many(read_phrases(reader)))
+        elif args.stdin:
+            events.log('phrases_submitted', "Queued phrases from {path}: {results}", path='stdin', results=jobs.submit_many(read_phrases(sys.stdin)))
+        if api_server:
+            print("Press Ctrl+C to stop accepting phrases and finish the queue.")
+            threading.Event().wait()
+        elif interactive:
+            print("Sentiment Analysis Tool")
+            while True:
+                phrase = input("\nEnter a phrase to analyze (or 'q' to exit): ").strip()
+                if phrase.lower() == 'q':
+                    break
+                if phrase:
+                    print(f"Phrase '{phrase}' {jobs.submit(phrase)}.")
+                else:
+                    print("Please enter a non-empty phrase.")
     except KeyboardInterrupt:
         print("\nExiting gracefully...")
     finally:
+        if api_server:
+            api_server.stop()
+        drain_jobs(jobs)
+        producer.close()
+        if not interactive:
+            print("Waiting for consumers to finish (Ctrl+C to stop them now)...")
+            try:
+                consumer_group.join()
+            except KeyboardInterrupt:
+                pass
         print("Thank you for using the Sentiment Analysis Tool.")
-        consumer_thread.join(timeout=5)
\ No newline at end of file
+        consumer_group.stop()
+        sources.close()
+        if metrics_server:
+            metrics_server.stop()
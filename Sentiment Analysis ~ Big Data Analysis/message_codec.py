@@ -0,0 +1,131 @@
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+FRAME_MAGIC = b'\x00'
+NULL_LENGTH = 0xFFFFFFFF
+
+def encode_json(message):
+    return json.dumps(message).encode('utf-8')
+
+def decode_json(data):
+    return json.loads(data.decode('utf-8') if isinstance(data, (bytes, bytearray, memoryview)) else data)
+
+def encode_msgpack(message):
+    return msgpack.packb(message, use_bin_type=True)
+
+def decode_msgpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+def pack_string(parts, value):
+    if value is None:
+        parts.append(struct.pack('<I', NULL_LENGTH))
+        return
+    encoded = str(value).encode('utf-8')
+    parts.append(struct.pack('<I', len(encoded)))
+    parts.append(encoded)
+
+def unpack_string(data, offset, unpack_length=struct.Struct('<I').unpack_from):
+    (length,) = unpack_length(data, offset)
+    offset += 4
+    if length == NULL_LENGTH:
+        return None, offset
+    end = offset + length
+    return data[offset:end].decode('utf-8'), end
+
+def encode_schema(message):
+    parts = []
+    pack_string(parts, message['phrase'])
+    pack_string(parts, message['scraped_text'])
+    articles = message.get('articles', [])
+    parts.append(struct.pack('<I', len(articles)))
+    for article in articles:
+        pack_string(parts, article.get('title'))
+        pack_string(parts, article.get('url'))
+    return b''.join(parts)
+
+def decode_schema(data):
+    phrase, offset = unpack_string(data, 0)
+    scraped_text, offset = unpack_string(data, offset)
+    (count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    articles = []
+    for _ in range(count):
+        title, offset = unpack_string(data, offset)
+        url, offset = unpack_string(data, offset)
+        articles.append({'title': title, 'url': url})
+    return {'phrase': phrase, 'scraped_text': scraped_text, 'articles': articles}
+
+FORMATS = {
+    'json': (1, encode_json, decode_json),
+    'msgpack': (2, encode_msgpack, decode_msgpack),
+    'schema': (3, encode_schema, decode_schema)
+}
+
+COMPRESSIONS = {
+    None: 0,
+    'zstd': 1,
+    'lz4': 2
+}
+
+class MessageCodec:
+    def __init__(self, format='json', compression=None, level=3):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown message format '{format}'")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown message compression '{compression}'")
+        if format == 'msgpack' and msgpack is None:
+            raise ImportError("The 'msgpack' format requires the msgpack package")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        if compression == 'lz4' and lz4 is None:
+            raise ImportError("lz4 compression requires the lz4 package")
+        self.format = format
+        self.compression = compression
+        self.level = level
+        self.formats_by_id = {format_id: (name, decode) for name, (format_id, _, decode) in FORMATS.items()}
+        self.compressions_by_id = {compression_id: name for name, compression_id in COMPRESSIONS.items()}
+        self.compressor = zstandard.ZstdCompressor(level=level) if compression == 'zstd' else None
+        self.decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+    def __reduce__(self):
+        return (MessageCodec, (self.format, self.compression, self.level))
+    def encode(self, message):
+        format_id, encode, _ = FORMATS[self.format]
+        payload = encode(message)
+        if self.format == 'json' and self.compression is None:
+            return payload
+        if self.compression == 'zstd':
+            payload = self.compressor.compress(payload)
+        elif self.compression == 'lz4':
+            payload = lz4.frame.compress(payload, compression_level=self.level)
+        return FRAME_MAGIC + bytes([format_id, COMPRESSIONS[self.compression]]) + payload
+    def decode(self, data):
+        if data[:1] != FRAME_MAGIC:
+            return decode_json(data)
+        format_id, compression_id = data[1], data[2]
+        if format_id not in self.formats_by_id or compression_id not in self.compressions_by_id:
+            raise ValueError(f"Unknown message frame header {bytes(data[:3])!r}")
+        payload = memoryview(data)[3:]
+        compression = self.compressions_by_id[compression_id]
+        if compression == 'zstd':
+            if self.decompressor is None:
+                raise ImportError("Decoding zstd messages requires the zstandard package")
+            payload = self.decompressor.decompress(payload)
+        elif compression == 'lz4':
+            if lz4 is None:
+                raise ImportError("Decoding lz4 messages requires the lz4 package")
+            payload = lz4.frame.decompress(payload)
+        _, decode = self.formats_by_id[format_id]
+        return decode(bytes(payload) if isinstance(payload, memoryview) else payload)
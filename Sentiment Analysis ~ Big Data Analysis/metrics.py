@@ -0,0 +1,187 @@
+from bisect import bisect_left
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+class Metric:
+    kind = 'untyped'
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+    def label_text(self, key, extra=None):
+        pairs = list(zip(self.label_names, key)) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self.key(labels), 0)
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in values.items():
+            yield self.name, self.label_text(key), value
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+class Counter(Metric):
+    kind = 'counter'
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    kind = 'histogram'
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    def value(self, **labels):
+        with self.lock:
+            state = self.values.get(self.key(labels))
+            return {'count': state[2], 'sum': state[1]} if state else {'count': 0, 'sum': 0.0}
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", self.label_text(key, ('le', format_value(bound))), cumulative
+            yield f"{self.name}_sum", self.label_text(key), total
+            yield f"{self.name}_count", self.label_text(key), count
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+    def register(self, metric_class, name, documentation, labels=(), **options):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, documentation, labels, **options)
+            elif type(metric) is not metric_class or metric.label_names != tuple(labels):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+            return metric
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter, name, documentation, labels)
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge, name, documentation, labels)
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram, name, documentation, labels, buckets=buckets)
+    def render(self):
+        with self.lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+registry = MetricsRegistry()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    def __init__(self, registry=registry, host='127.0.0.1', port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = self.registry
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        events.log('metrics_serving', "Serving metrics on {url}", url=f"http://{self.host}:{self.port}/metrics")
+        return self.port
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+
+class EventLog:
+    def __init__(self, format='text', sample_rate=1.0, stream=None):
+        self.configure(format, sample_rate, stream)
+    def configure(self, format='text', sample_rate=1.0, stream=None):
+        if format not in ('text', 'json'):
+            raise ValueError(f"Unknown log format: {format}")
+        self.format = format
+        self.sample_rate = sample_rate
+        self.stream = stream
+    def log(self, event, message, sampled=False, **fields):
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if self.format == 'json':
+            line = json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, default=str)
+        else:
+            line = message.format(**fields)
+        print(line, file=self.stream)
+
+events = EventLog()
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import events, registry
+
+SOURCES = ['newsapi', 'gdelt', 'wikipedia', 'tmdb', 'openai']
+
+DEFAULT_URLS = {
+    'newsapi': 'https://newsapi.org/v2/everything',
+    'gdelt': 'https://api.gdeltproject.org/api/v2/doc/doc',
+    'wikipedia': 'https://en.wikipedia.org/api/rest_v1/page/summary/',
+    'tmdb': 'https://api.themoviedb.org/3/search/movie',
+    'openai': 'https://api.openai.com/v1/completions'
+}
+
+DEFAULT_TIMEOUTS = {
+    'newsapi': 10,
+    'gdelt': 15,
+    'wikipedia': 10,
+    'tmdb': 10,
+    'openai': 30
+}
+
+FETCH_SECONDS = registry.histogram('news_source_fetch_seconds', 'Time to fetch one phrase from a news source.', ['source'])
+FETCH_ERRORS = registry.counter('news_source_errors_total', 'News source fetches that failed or timed out.', ['source'])
+
+class NewsSources:
+    def __init__(self, newsapi_key='', tmdb_api_key='', openai_api_key='', base_urls=None, timeouts=None, pool_size=10, cache=None):
+        self.newsapi_key = newsapi_key
+        self.tmdb_api_key = tmdb_api_key
+        self.openai_api_key = openai_api_key
+        self.urls = {**DEFAULT_URLS, **{name: url for name, url in (base_urls or {}).items() if url}}
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.cache = cache
+        self.sessions = {name: self.create_session(pool_size) for name in SOURCES}
+        self.executor = ThreadPoolExecutor(max_workers=len(SOURCES) * pool_size, thread_name_prefix='news-source')
+    def create_session(self, pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    def request(self, source, method, url, params=None, headers=None, json_body=None):
+        session = self.sessions[source]
+        timeout = self.timeouts[source]
+        if self.cache is None:
+            return session.request(method, url, params=params, headers=headers, json=json_body, timeout=timeout)
+        return self.cache.request(session, source, method, url, params=params, headers=headers, json_body=json_body, timeout=timeout)
+    def fetch_newsapi(self, phrase):
+        scraped_text = ""
+        articles = []
+        events.log('source_fetch', "Fetching news articles for '{phrase}' from NewsAPI...", sampled=True, source='newsapi', phrase=phrase)
+        params = {'q': phrase, 'language': 'en', 'sortBy': 'relevancy', 'pageSize': 5}
+        articles_response = self.request('newsapi', 'GET', self.urls['newsapi'], params=params, headers={'X-Api-Key': self.newsapi_key}).json()
+        if articles_response.get('status') == 'ok':
+            for article in articles_response['articles']:
+                title = article['title']
+                description = article['description']
+                scraped_text += f"{title} {description} "
+                articles.append({'title': title, 'url': article['url']})
+        else:
+            events.log('source_empty', "No articles found on NewsAPI for '{phrase}'.", sampled=True, source='newsapi', phrase=phrase)
+        return scraped_text, articles
+    def fetch_gdelt(self, phrase):
+        scraped_text = ""
+        articles = []
+        events.log('source_fetch', "Fetching data for '{phrase}' from GDELT...", sampled=True, source='gdelt', phrase=phrase)
+        params = {'query': phrase, 'mode': 'artlist', 'format': 'json'}
+        gdelt_data = self.request('gdelt', 'GET', self.urls['gdelt'], params=params).json()
+        if 'articles' in gdelt_data:
+            for article in gdelt_data['articles']:
+                title = article['title']
+                scraped_text += f"{title} "
+                articles.append({'title': title, 'url': article['url']})
+        else:
+            events.log('source_empty', "No data found on GDELT for '{phrase}'.", sampled=True, source='gdelt', phrase=phrase)
+        return scraped_text, articles
+    def fetch_wikipedia(self, phrase):
+        events.log('source_fetch', "Fetching data for '{phrase}' from Wikipedia...", sampled=True, source='wikipedia', phrase=phrase)
+        wikipedia_url = self.urls['wikipedia'] + requests.utils.quote(phrase)
+        wikipedia_response = self.request('wikipedia', 'GET', wikipedia_url)
+        if wikipedia_response.status_code != 200:
+            events.log('source_empty', "No Wikipedia page found for '{phrase}'.", sampled=True, source='wikipedia', phrase=phrase)
+            return "", []
+        return wikipedia_response.json().get('extract', ''), []
+    def fetch_tmdb(self, phrase):
+        scraped_text = ""
+        articles = []
+        events.log('source_fetch', "Fetching movie information for '{phrase}' from TMDb...", sampled=True, source='tmdb', phrase=phrase)
+        params = {'api_key': self.tmdb_api_key, 'query': phrase}
+        tmdb_data = self.request('tmdb', 'GET', self.urls['tmdb'], params=params).json()
+        if 'results' in tmdb_data and tmdb_data['results']:
+            for movie in tmdb_data['results']:
+                title = movie['title']
+                scraped_text += f"Movie: {title} Overview: {movie['overview']} "
+                articles.append({'title': title, 'url': f"https://www.themoviedb.org/movie/{movie['id']}"})
+        else:
+            events.log('source_empty', "No movie data found on TMDb for '{phrase}'.", sampled=True, source='tmdb', phrase=phrase)
+        return scraped_text, articles
+    def fetch_openai(self, phrase):
+        events.log('source_fetch', "Fetching OpenAI-generated text for '{phrase}'...", sampled=True, source='openai', phrase=phrase)
+        headers = {
+            'Authorization': f'Bearer {self.openai_api_key}',
+            'Content-Type': 'application/json',
+        }
+        openai_data = {
+            "model": "text-davinci-003",
+            "prompt": f"Generate a short description about '{phrase}'",
+            "max_tokens": 150,
+        }
+        openai_response = self.request('openai', 'POST', self.urls['openai'], headers=headers, json_body=openai_data)
+        openai_text = openai_response.json().get('choices', [{}])[0].get('text', '')
+        if not openai_text:
+            events.log('source_empty', "No OpenAI-generated text for '{phrase}'.", sampled=True, source='openai', phrase=phrase)
+            return "", []
+        return f"OpenAI Summary: {openai_text}", []
+    def fetch(self, name, phrase):
+        with FETCH_SECONDS.time(source=name):
+            return getattr(self, f'fetch_{name}')(phrase)
+    def fetch_all(self, phrase, time_limit=180):
+        futures = {name: self.executor.submit(self.fetch, name, phrase) for name in SOURCES}
+        wait(futures.values(), timeout=time_limit)
+        scraped_text = ""
+        articles = []
+        for name in SOURCES:
+            future = futures[name]
+            if not future.done():
+                future.cancel()
+                FETCH_ERRORS.inc(source=name)
+                events.log('source_error', "Fetching from {source} did not finish within {time_limit} seconds.", source=name, time_limit=time_limit)
+                continue
+            try:
+                text, found = future.result()
+            except requests.exceptions.Timeout:
+                FETCH_ERRORS.inc(source=name)
+                events.log('source_error', "{source} fetching timed out after {timeout} seconds.", source=name, timeout=self.timeouts[name])
+                continue
+            except Exception as e:
+                FETCH_ERRORS.inc(source=name)
+                events.log('source_error', "Error fetching from {source}: {error}", source=name, error=e)
+                continue
+            scraped_text += text
+            articles.extend(found)
+        return scraped_text, articles
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for session in self.sessions.values():
+            session.close()
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+import time
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+from metrics import events
+
+ARTICLE_TYPE = pa.struct([('title', pa.string()), ('url', pa.string())])
+
+SCHEMA = pa.schema([
+    ('phrase', pa.string()),
+    ('scraped_text', pa.string()),
+    ('articles', pa.list_(ARTICLE_TYPE)),
+    ('timestamp', pa.timestamp('ms', tz='UTC'))
+])
+
+SCORED_SCHEMA = SCHEMA.append(pa.field('sentiment', pa.string())).append(pa.field('polarity', pa.float64()))
+
+class ParquetSink:
+    def __init__(self, root_uri, max_rows=50000, max_bytes=64 * 1024 * 1024, max_seconds=300, compression='snappy', filesystem=None, schema=SCHEMA):
+        if filesystem is None:
+            self.filesystem, self.root = fs.FileSystem.from_uri(root_uri)
+        else:
+            self.filesystem, self.root = filesystem, root_uri
+        self.root = self.root.rstrip('/')
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compression = compression
+        self.schema = schema
+        self.scored = 'polarity' in schema.names
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.opened_at = time.time()
+        self.files_written = 0
+    def write(self, record):
+        timestamp = record.get('timestamp')
+        if timestamp is None:
+            timestamp = time.time() * 1000
+        row = {
+            'phrase': record['phrase'],
+            'scraped_text': record.get('scraped_text', ''),
+            'articles': [{'title': article.get('title'), 'url': article.get('url')} for article in record.get('articles', [])],
+            'timestamp': datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+        }
+        if self.scored:
+            row['sentiment'] = record.get('sentiment')
+            row['polarity'] = record.get('polarity')
+        if not self.buffer:
+            self.opened_at = time.time()
+        self.buffer.append(row)
+        self.buffer_bytes += len(record['phrase']) + len(record.get('scraped_text', '')) + sum(len(article.get('url') or '') + len(article.get('title') or '') for article in record.get('articles', []))
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+    def checkpoint(self, force=False):
+        if force or self.roll_due():
+            for path in self.roll():
+                events.log('parquet_written', "Saved to HDFS: {path}", path=path)
+        return not self.buffer
+    def roll_due(self):
+        if not self.buffer:
+            return False
+        return len(self.buffer) >= self.max_rows or self.buffer_bytes >= self.max_bytes or time.time() - self.opened_at >= self.max_seconds
+    def roll(self):
+        if not self.buffer:
+            self.opened_at = time.time()
+            return []
+        partitions = {}
+        for row in self.buffer:
+            partitions.setdefault(row['timestamp'].strftime('%Y-%m-%d'), []).append(row)
+        written = []
+        for date, rows in sorted(partitions.items()):
+            directory = f"{self.root}/date={date}"
+            self.filesystem.create_dir(directory, recursive=True)
+            path = f"{directory}/part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+            table = pa.Table.from_pylist(rows, schema=self.schema)
+            pq.write_table(table, path, filesystem=self.filesystem, compression=self.compression)
+            written.append(path)
+        self.files_written += len(written)
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.opened_at = time.time()
+        return written
+    def close(self):
+        return self.roll()
@@ -0,0 +1,122 @@
+import hashlib
+import math
+import threading
+import time
+from metrics import events, registry
+
+PHRASE_CHECKS = registry.counter('phrase_cache_checks_total', 'HDFS phrase existence checks by where they were answered and whether the phrase is stored.', ['source', 'found'])
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+class PhraseCache:
+    def __init__(self, client, root='/user/hadoop/news_data/', ttl=300, capacity=100000, error_rate=0.01, refresh_interval=3600):
+        self.client = client
+        self.root = root.rstrip('/') + '/'
+        self.ttl = ttl
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.statuses = {}
+        self.warmed_at = None
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.bloom_skips = 0
+        self.namenode_lookups = 0
+    def path_for(self, phrase):
+        return f'{self.root}{phrase.replace(" ", "_")}.json'
+    def list_paths(self):
+        return {self.root + name for name in self.client.list(self.root) if name.endswith('.json')}
+    def warm(self):
+        listed_at = time.time()
+        paths = self.list_paths()
+        bloom = BloomFilter(max(self.capacity, len(paths) * 2), self.error_rate)
+        now = time.time()
+        for path in paths:
+            bloom.add(path)
+        with self.lock:
+            # keep phrases written while the listing ran, which it may have missed
+            written = [path for path, (found, at) in self.statuses.items() if found and at >= listed_at and path not in paths]
+            for path in written:
+                bloom.add(path)
+            self.statuses = {**{path: self.statuses[path] for path in written}, **{path: (True, now) for path in paths}}
+            self.bloom = bloom
+            self.warmed_at = now
+        events.log('phrase_cache_warmed', "Warmed HDFS phrase cache with {count} stored phrases.", count=len(paths))
+        return len(paths)
+    def mark_written(self, path):
+        with self.lock:
+            self.bloom.add(path)
+            self.statuses[path] = (True, time.time())
+    def refresh(self):
+        try:
+            self.warm()
+        except Exception as e:
+            events.log('phrase_cache_error', "Error refreshing HDFS phrase cache: {error}", error=e)
+        finally:
+            with self.lock:
+                self.refreshing = False
+    def start_refresh(self, now):
+        # one background refresh at a time; fetch workers keep answering from the current filter meanwhile
+        with self.lock:
+            if self.refreshing or self.warmed_at is None or now - self.warmed_at < self.refresh_interval:
+                return None
+            self.refreshing = True
+        thread = threading.Thread(target=self.refresh, name='phrase-cache-refresh', daemon=True)
+        thread.start()
+        return thread
+    def exists(self, path):
+        now = time.time()
+        self.start_refresh(now)
+        with self.lock:
+            if self.warmed_at is not None and path not in self.bloom:
+                self.bloom_skips += 1
+                PHRASE_CHECKS.inc(source='bloom', found='false')
+                return False
+            entry = self.statuses.get(path)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.hits += 1
+                PHRASE_CHECKS.inc(source='ttl', found=str(entry[0]).lower())
+                return entry[0]
+        self.namenode_lookups += 1
+        found = bool(self.client.status(path, strict=False))
+        PHRASE_CHECKS.inc(source='namenode', found=str(found).lower())
+        with self.lock:
+            self.statuses[path] = (found, now)
+            if found:
+                self.bloom.add(path)
+        return found
+    def exists_many(self, phrases):
+        paths = self.list_paths()
+        now = time.time()
+        with self.lock:
+            for path in paths:
+                if path not in self.bloom:
+                    self.bloom.add(path)
+                self.statuses[path] = (True, now)
+        return {phrase: self.path_for(phrase) in paths for phrase in phrases}
+    def stats(self):
+        with self.lock:
+            return {
+                'known_paths': sum(1 for found, _ in self.statuses.values() if found),
+                'ttl_hits': self.hits,
+                'bloom_skips': self.bloom_skips,
+                'namenode_lookups': self.namenode_lookups
+            }
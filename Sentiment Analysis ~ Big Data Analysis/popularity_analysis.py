@@ -1,62 +1,200 @@
 import os
 import json
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
-from hdfs import InsecureClient
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from local_file_utils import LocalFileUtils
 
-hdfs_client = InsecureClient('http://localhost:9870', user='hadoop')
+CHART_VERSION = 1
+ROLLUP_COLUMNS = ['phrase', 'window_start', 'count', 'polarity_sum', 'polarity_min', 'polarity_max', 'positive', 'negative', 'neutral']
 
-def plot_sentiment_for_phrase(phrase):
-    hdfs_path = f'/user/hadoop/news_data/{phrase.replace(" ", "_")}.json'
-    try:
-        with hdfs_client.read(hdfs_path) as reader:
-            data = json.loads(reader.read())
-            scraped_text = data.get('scraped_text', '')
-    except Exception as e:
-        print(f"Error reading from HDFS for phrase '{phrase}': {e}")
+class SentimentRollup:
+    def __init__(self, file_utils=None, filename='articles.json', state_dir='./news_articles/rollups', window_seconds=3600, chunk_size=50000):
+        self.file_utils = file_utils or LocalFileUtils()
+        self.filename = filename
+        self.state_dir = state_dir
+        self.window_seconds = window_seconds
+        self.chunk_size = chunk_size
+        self.rollup_path = os.path.join(state_dir, f"rollup_{window_seconds}s.csv")
+        self.checkpoint_path = os.path.join(state_dir, f"checkpoint_{window_seconds}s.json")
+        os.makedirs(state_dir, exist_ok=True)
+        self.rollup = self.load_rollup()
+        self.checkpoints = self.load_checkpoints()
+    def load_rollup(self):
+        if os.path.exists(self.rollup_path):
+            return pd.read_csv(self.rollup_path, dtype={'phrase': str}, keep_default_na=False, float_precision='round_trip')
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    def load_checkpoints(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as reader:
+                return json.load(reader)
+        return {}
+    def save(self):
+        self.rollup.to_csv(self.rollup_path + '.tmp', index=False)
+        with open(self.checkpoint_path + '.tmp', 'w', encoding='utf-8') as writer:
+            json.dump(self.checkpoints, writer)
+        os.replace(self.rollup_path + '.tmp', self.rollup_path)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+    def aggregate(self, phrases, timestamps, polarities, sentiments):
+        frame = pd.DataFrame({
+            'phrase': phrases,
+            'window_start': (np.asarray(timestamps, dtype=np.float64) // self.window_seconds * self.window_seconds).astype(np.int64),
+            'polarity': np.asarray(polarities, dtype=np.float64),
+            'sentiment': pd.Categorical(sentiments, categories=['positive', 'negative', 'neutral'])
+        })
+        grouped = frame.groupby(['phrase', 'window_start'], sort=False)
+        stats = grouped['polarity'].agg(count='count', polarity_sum='sum', polarity_min='min', polarity_max='max')
+        labels = frame.groupby(['phrase', 'window_start', 'sentiment'], sort=False, observed=False).size().unstack('sentiment', fill_value=0)
+        return stats.join(labels, how='left').fillna(0).reset_index()[ROLLUP_COLUMNS]
+    def merge(self, batch):
+        combined = pd.concat([self.rollup, batch], ignore_index=True) if len(self.rollup) else batch
+        self.rollup = combined.groupby(['phrase', 'window_start'], as_index=False, sort=True).agg({
+            'count': 'sum',
+            'polarity_sum': 'sum',
+            'polarity_min': 'min',
+            'polarity_max': 'max',
+            'positive': 'sum',
+            'negative': 'sum',
+            'neutral': 'sum'
+        })[ROLLUP_COLUMNS]
+    def update(self):
+        processed = 0
+        phrases, timestamps, polarities, sentiments = [], [], [], []
+        for record in self.file_utils.scan_since(self.filename, self.checkpoints):
+            value = record['value']
+            phrases.append(record['key'])
+            timestamps.append(record['ts'])
+            polarities.append(value.get('polarity', 0.0))
+            sentiments.append(value.get('sentiment', 'neutral'))
+            if len(phrases) >= self.chunk_size:
+                self.merge(self.aggregate(phrases, timestamps, polarities, sentiments))
+                processed += len(phrases)
+                phrases, timestamps, polarities, sentiments = [], [], [], []
+        if phrases:
+            self.merge(self.aggregate(phrases, timestamps, polarities, sentiments))
+            processed += len(phrases)
+        self.save()
+        print(f"Rolled up {processed} new results into {len(self.rollup)} phrase windows.")
+        return processed
+    def phrases(self):
+        return sorted(self.rollup['phrase'].unique())
+    def series(self, phrase, rows=None):
+        if rows is None:
+            rows = self.rollup[self.rollup['phrase'] == phrase]
+        rows = rows.sort_values('window_start')
+        return pd.DataFrame({
+            'time': pd.to_datetime(rows['window_start'], unit='s'),
+            'mean_polarity': rows['polarity_sum'] / rows['count'],
+            'min_polarity': rows['polarity_min'],
+            'max_polarity': rows['polarity_max'],
+            'count': rows['count']
+        })
+    def summary(self):
+        grouped = self.rollup.groupby('phrase')
+        summary = grouped[['count', 'polarity_sum', 'positive', 'negative', 'neutral']].sum()
+        summary['mean_polarity'] = summary['polarity_sum'] / summary['count']
+        summary['first_seen'] = pd.to_datetime(grouped['window_start'].min(), unit='s')
+        summary['last_seen'] = pd.to_datetime(grouped['window_start'].max() + self.window_seconds, unit='s')
+        return summary.drop(columns='polarity_sum')
+
+def render_chart(phrase, series, path):
+    start = time.perf_counter()
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.plot(series['time'], series['mean_polarity'], marker='o', linestyle='-', color='blue', label='Mean Sentiment Polarity')
+    ax.fill_between(series['time'], series['min_polarity'], series['max_polarity'], color='blue', alpha=0.15, label='Polarity Range')
+    ax.axhline(0, color='black', linewidth=0.8, linestyle='--', label='Neutral Sentiment')
+    ax.set_title(f'Sentiment Polarity over Time for "{phrase}"')
+    ax.set_xlabel('Time Window')
+    ax.set_ylabel('Sentiment Polarity')
+    ax.set_ylim(-1.05, 1.05)
+    ax.grid()
+    ax.legend()
+    figure.tight_layout()
+    figure.savefig(path)
+    return phrase, time.perf_counter() - start
+
+def chart_path(chart_dir, phrase):
+    return os.path.join(chart_dir, f"{phrase.replace(' ', '_')}_sentiment.jpg")
+
+def plot_sentiment_for_phrase(phrase, rollup, chart_dir='chart'):
+    series = rollup.series(phrase)
+    if series.empty:
+        print(f"No stored results for phrase '{phrase}'.")
         return
-    positive_count = scraped_text.lower().count("positive")
-    negative_count = scraped_text.lower().count("negative")
-    x = np.arange(0, 100)
-    y = np.zeros_like(x, dtype=float)
-    y += 0.5
-    num_jumps = np.random.choice(range(2, 8, 2))
-    drop_positions = sorted(np.random.choice(range(0, 100), num_jumps, replace=False))
-    jump_values = np.random.uniform(-2, 2, num_jumps)
-    for i, pos in enumerate(drop_positions):
-        if i % 2 == 0:
-            y[pos:pos + 5] = -1.5
-        else:
-            y[pos:pos + 5] = 1.5 + jump_values[i]
-    y[60:] = 0.5  
-    chart_dir = 'chart'
     os.makedirs(chart_dir, exist_ok=True)
-    plt.figure(figsize=(12, 6))
-    plt.plot(x, y, marker='o', linestyle='-', color='blue', label='Sentiment Polarity')
-    plt.axhline(0, color='black', linewidth=0.8, linestyle='--', label='Neutral Sentiment')
-    plt.title(f'Sentiment Polarity with Random Drops and Jumps for "{phrase}"')
-    plt.xlabel('Time / Samples')
-    plt.ylabel('Sentiment Polarity')
-    plt.xticks(np.arange(0, 101, 10))
-    plt.yticks(np.arange(-2, 3, 0.5))
-    plt.grid()
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(chart_dir, f"{phrase.replace(' ', '_')}_sentiment.jpg"))
-    plt.close()
+    render_chart(phrase, series, chart_path(chart_dir, phrase))
+
+class ChartRenderer:
+    def __init__(self, rollup, chart_dir='chart', workers=None, prefetch_workers=4):
+        self.rollup = rollup
+        self.chart_dir = chart_dir
+        self.workers = workers
+        self.prefetch_workers = prefetch_workers
+        self.manifest_path = os.path.join(chart_dir, 'manifest.json')
+        os.makedirs(chart_dir, exist_ok=True)
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as reader:
+                return json.load(reader)
+        return {}
+    def save_manifest(self, manifest):
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as writer:
+            json.dump(manifest, writer)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+    def prepare(self, phrase, rows):
+        series = self.rollup.series(phrase, rows)
+        digest = hashlib.sha256(f"{CHART_VERSION}:{phrase}".encode('utf-8'))
+        for column in ['mean_polarity', 'min_polarity', 'max_polarity', 'count']:
+            digest.update(np.ascontiguousarray(series[column].to_numpy(dtype=np.float64)).tobytes())
+        digest.update(series['time'].to_numpy(dtype='datetime64[s]').astype(np.int64).tobytes())
+        return phrase, series, digest.hexdigest()
+    def render_all(self, phrases=None):
+        timings = {'prefetch': 0.0, 'render': 0.0, 'wall': 0.0}
+        wall_start = time.perf_counter()
+        manifest = self.load_manifest()
+        groups = self.rollup.rollup.groupby('phrase', sort=False).indices
+        phrases = sorted(groups) if phrases is None else [phrase for phrase in phrases if phrase in groups]
+        rendered, skipped = 0, 0
+        with ThreadPoolExecutor(max_workers=self.prefetch_workers) as prefetch, ProcessPoolExecutor(max_workers=self.workers) as pool:
+            def timed_prepare(phrase):
+                start = time.perf_counter()
+                result = self.prepare(phrase, self.rollup.rollup.iloc[groups[phrase]])
+                return result, time.perf_counter() - start
+            futures = {}
+            for (phrase, series, digest), seconds in prefetch.map(timed_prepare, phrases):
+                timings['prefetch'] += seconds
+                path = chart_path(self.chart_dir, phrase)
+                if manifest.get(phrase) == digest and os.path.exists(path):
+                    skipped += 1
+                    continue
+                futures[pool.submit(render_chart, phrase, series, path)] = digest
+            for future, digest in futures.items():
+                try:
+                    phrase, seconds = future.result()
+                except Exception as e:
+                    print(f"Error rendering chart: {e}")
+                    continue
+                manifest[phrase] = digest
+                timings['render'] += seconds
+                rendered += 1
+        self.save_manifest(manifest)
+        timings['wall'] = time.perf_counter() - wall_start
+        print(f"Rendered {rendered} charts, skipped {skipped} unchanged.")
+        print(f"Stage timings (s): prefetch={timings['prefetch']:.2f} render={timings['render']:.2f} wall={timings['wall']:.2f}")
+        return timings
 
-def get_phrases_from_hdfs():
-    try:
-        hdfs_path = '/user/hadoop/news_data/'
-        files = hdfs_client.list(hdfs_path)
-        phrases = [file.replace('.json', '').replace('_', ' ') for file in files if file.endswith('.json')]
-        return phrases
-    except Exception as e:
-        print(f"Error reading files from HDFS: {e}")
-        return []
 def main():
-    phrases = get_phrases_from_hdfs()
-    for phrase in phrases:
-        plot_sentiment_for_phrase(phrase)
+    start = time.perf_counter()
+    rollup = SentimentRollup()
+    rollup.update()
+    print(f"Stage timings (s): rollup={time.perf_counter() - start:.2f}")
+    print(rollup.summary().to_string())
+    ChartRenderer(rollup).render_all()
 if __name__ == "__main__":
     main()
@@ -1,17 +1,443 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+import hashlib
+from itertools import chain
+import json
+import os
+import threading
+import time
+import numpy as np
 from textblob import TextBlob
+from metrics import events, registry
+
+SCORING_SECONDS = registry.histogram('sentiment_scoring_seconds', 'Time to score one batch of texts, per engine.', ['engine'])
+SCORED_TEXTS = registry.counter('sentiment_texts_total', 'Texts scored or answered from the polarity cache.', ['result'])
+
+class PolarityCache:
+    def __init__(self, max_entries=10000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as reader:
+                    self.entries.update(json.load(reader))
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            except ValueError as e:
+                events.log('polarity_cache_unreadable', "Ignoring unreadable polarity cache {path}: {error}", path=path, error=e)
+    @staticmethod
+    def key(text):
+        normalized = ' '.join(text.lower().split())
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    def get(self, key):
+        with self.lock:
+            polarity = self.entries.get(key)
+            if polarity is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return polarity
+    def put(self, key, polarity):
+        with self.lock:
+            self.entries[key] = polarity
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self.entries)
+            }
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            snapshot = dict(self.entries)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as writer:
+            json.dump(snapshot, writer)
+        os.replace(tmp_path, self.path)
+
+class PendingScores:
+    def __init__(self, futures, cache=None, scores=None, keys=None, missing=None):
+        self.futures = futures
+        self.cache = cache
+        self.scores = scores
+        self.keys = keys
+        self.missing = missing
+    def done(self):
+        return all(future.done() for future in self.futures)
+    def result(self, timeout=None):
+        computed = []
+        for future in self.futures:
+            computed.extend(future.result(timeout))
+        if self.missing is None:
+            return computed
+        scores = list(self.scores)
+        for i, polarity in zip(self.missing, computed):
+            scores[i] = polarity
+            self.cache.put(self.keys[i], polarity)
+        return scores
 
 class SentimentAnalyzer:
-    def analyze_sentiment(self, text):
+    def __init__(self, cache_size=10000, cache_path=None):
+        self.cache = PolarityCache(cache_size, cache_path) if cache_size else None
+    def polarity(self, text):
         try:
             blob = TextBlob(text)
             return blob.sentiment.polarity
         except Exception as e:
-            print(f"Error in sentiment analysis: {e}")
+            events.log('sentiment_error', "Error in sentiment analysis: {error}", error=e)
             return 0
+    def analyze_sentiment(self, text):
+        return self.analyze_batch([text])[0]
+    def analyze_batch(self, texts):
+        return self.submit_batch(texts).result()
+    def score_texts(self, texts):
+        future = Future()
+        with SCORING_SECONDS.time(engine='textblob'):
+            future.set_result([self.polarity(text) for text in texts])
+        return [future]
+    def submit_batch(self, texts):
+        texts = list(texts)
+        if self.cache is None:
+            SCORED_TEXTS.inc(len(texts), result='scored')
+            return PendingScores(self.score_texts(texts))
+        keys = [PolarityCache.key(text) for text in texts]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, polarity in enumerate(scores) if polarity is None]
+        SCORED_TEXTS.inc(len(texts) - len(missing), result='cached')
+        SCORED_TEXTS.inc(len(missing), result='scored')
+        futures = self.score_texts([texts[i] for i in missing]) if missing else []
+        return PendingScores(futures, self.cache, scores, keys, missing)
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {}
+    def close(self):
+        if self.cache:
+            self.cache.save()
     def categorize_sentiment(self, polarity):
         if polarity > 0.001:
             return 'positive'
         elif polarity < -0.001:
             return 'negative'
         else :
-            return 'neutral'
\ No newline at end of file
+            return 'neutral'
+
+class SentimentLexicon:
+    columns = ('known', 'modifier', 'ly', 'negation', 'long', 'short_retained', 'exclamation')
+    def __init__(self, max_unknown=200000):
+        from textblob import _text
+        from textblob.en import sentiment
+        self.punctuation = tuple(_text.PUNCTUATION.replace('.', ''))
+        self.trailing = self.punctuation + ('.',)
+        self.all_punctuation = _text.PUNCTUATION
+        self.abbreviations = _text.ABBREVIATIONS
+        self.abbreviation_patterns = (_text.RE_ABBR1, _text.RE_ABBR2, _text.RE_ABBR3)
+        self.replacements = _text.replacements
+        self.sarcasm = _text.RE_SARCASM
+        self.emoticons = _text.RE_EMOTICONS
+        self.eos = _text.EOS
+        self.negations = set(sentiment.negations)
+        self.emoticon_polarity = {}
+        for (_, polarity), faces in _text.EMOTICONS.items():
+            for face in faces:
+                self.emoticon_polarity.setdefault(face.lower(), polarity)
+        self.preceders = {}
+        for face in [face for faces in _text.EMOTICONS.values() for face in faces] + ['(!)']:
+            for i in range(1, len(face)):
+                self.preceders.setdefault(face[i:], set()).add(face[i - 1])
+        self.suffixes = {suffix: i for i, suffix in enumerate(self.preceders)}
+        self.last_chars = {char: i + 1 for i, char in enumerate(sorted(set().union(*self.preceders.values())))}
+        self.follows = np.zeros((len(self.suffixes), len(self.last_chars) + 1), dtype=bool)
+        for suffix, chars in self.preceders.items():
+            self.follows[self.suffixes[suffix], [self.last_chars[char] for char in chars]] = True
+        self.lexicon = {word: tuple(entries[None]) for word, entries in sentiment.items()}
+        self.modifiers = {word for word, entries in sentiment.items() if any(tag in entries for tag in sentiment.modifiers)}
+        self.max_unknown = max_unknown
+        self.lock = threading.Lock()
+        self.reset()
+    def reset(self):
+        capacity = len(self.lexicon) * 2
+        self.ids = {}
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.polarity = np.zeros(capacity)
+        self.intensity = np.ones(capacity)
+        self.mood = np.full(capacity, np.nan)
+        for word in self.lexicon:
+            self.add(word)
+        # Raw tokens get their own ids; their lowercased pieces are stored CSR-style in piece_ids.
+        self.tokens = {}
+        self.splits = []
+        self.token_start = np.zeros(capacity, dtype=np.intp)
+        self.token_count = np.zeros(capacity, dtype=np.intp)
+        self.token_suffix = np.full(capacity, -2, dtype=np.intp)
+        self.token_last = np.zeros(capacity, dtype=np.intp)
+        self.piece_ids = np.zeros(capacity, dtype=np.intp)
+        self.piece_count = 0
+        self.add_tokens([self.eos, '\x00'])
+        self.separator = self.tokens['\x00']
+    def add(self, word):
+        index = len(self.ids)
+        if index == len(self.polarity):
+            self.flags = np.resize(self.flags, index * 2)
+            self.polarity = np.resize(self.polarity, index * 2)
+            self.intensity = np.resize(self.intensity, index * 2)
+            self.mood = np.resize(self.mood, index * 2)
+        known = word in self.lexicon
+        flags = (known, word in self.modifiers, word.endswith('ly'), word in self.negations, len(word) > 2, len(word.strip("'")) <= 1, word == '!')
+        self.flags[index] = sum(1 << bit for bit, flag in enumerate(flags) if flag)
+        if known:
+            self.polarity[index], _, self.intensity[index] = self.lexicon[word]
+        else:
+            self.polarity[index], self.intensity[index] = 0.0, 1.0
+        self.mood[index] = np.nan
+        if not known and word == '(!)':
+            self.mood[index] = 0.0
+        elif not known and not word.isalpha() and len(word) <= 5 and word not in self.all_punctuation:
+            self.mood[index] = self.emoticon_polarity.get(word, np.nan)
+        self.ids[word] = index
+        return index
+    def split(self, token):
+        if not token.startswith(self.trailing) and not token.endswith(self.trailing):
+            return token
+        head, tail = [], []
+        while token.startswith(self.punctuation) and token not in self.replacements:
+            head.append(token[0])
+            token = token[1:]
+        while token.endswith(self.trailing) and token not in self.replacements:
+            if token.endswith(self.punctuation):
+                tail.append(token[-1])
+                token = token[:-1]
+            if token.endswith('...'):
+                tail.append('...')
+                token = token[:-3].rstrip('.')
+            if token.endswith('.'):
+                if token in self.abbreviations or any(pattern.match(token) for pattern in self.abbreviation_patterns):
+                    break
+                tail.append(token[-1])
+                token = token[:-1]
+        if token != '':
+            head.append(token)
+        head.extend(reversed(tail))
+        return ' '.join(head)
+    def normalize(self, text):
+        # Only "n't" changes the tokens: the other contractions are split again by the quote padding.
+        text = text.replace("n't", " n't")
+        return text.replace('“', ' “ ').replace('”', ' ” ').replace('‘', ' ‘ ').replace('’', ' ’ ').replace("'", " ' ").replace('"', ' " ')
+    def add_tokens(self, tokens):
+        first, last = len(self.tokens), len(self.tokens) + len(tokens)
+        if last > len(self.token_start):
+            capacity = max(last, len(self.token_start) * 2)
+            self.token_start = np.resize(self.token_start, capacity)
+            self.token_count = np.resize(self.token_count, capacity)
+            self.token_suffix = np.resize(self.token_suffix, capacity)
+            self.token_last = np.resize(self.token_last, capacity)
+        splits = ['' if token == self.eos else self.split(token) for token in tokens]
+        suffixes = []
+        for split in splits:
+            words = split.split()
+            if len(words) > 1 and any(words[i - 1][-1] in self.preceders.get(words[i], ()) for i in range(1, len(words))):
+                suffixes.append(-1)
+            elif words and words[0] in self.preceders:
+                suffixes.append(self.suffixes[words[0]])
+            else:
+                suffixes.append(-2)
+        pieces = [split.lower().split() for split in splits]
+        counts = np.fromiter(map(len, pieces), dtype=np.intp, count=len(pieces))
+        words = list(chain.from_iterable(pieces))
+        for word in dict.fromkeys(words):
+            if word not in self.ids:
+                self.add(word)
+        flat = list(map(self.ids.__getitem__, words))
+        if self.piece_count + len(flat) > len(self.piece_ids):
+            self.piece_ids = np.resize(self.piece_ids, max(self.piece_count + len(flat), len(self.piece_ids) * 2))
+        self.piece_ids[self.piece_count:self.piece_count + len(flat)] = flat
+        self.token_start[first:last] = self.piece_count + np.cumsum(counts) - counts
+        self.token_count[first:last] = counts
+        self.token_suffix[first:last] = suffixes
+        self.token_last[first:last] = [self.last_chars.get(token[-1], 0) for token in tokens]
+        self.piece_count += len(flat)
+        self.splits.extend(splits)
+        self.tokens.update(zip(tokens, range(first, last)))
+    def rejoined(self, token_ids, starts, owners):
+        # Pattern re-joins emoticons and "(!)" torn apart by punctuation splitting, e.g. ": )".
+        suffix = self.token_suffix[token_ids]
+        candidates = np.flatnonzero(suffix != -2)
+        suffix = suffix[candidates]
+        previous = token_ids[np.maximum(candidates - 1, 0)]
+        follows = (candidates > starts[owners[candidates]]) & self.follows[np.maximum(suffix, 0), self.token_last[previous]]
+        return np.unique(owners[candidates[(suffix == -1) | follows]]).tolist()
+    def rejoined_ids(self, token_ids):
+        text, sarcastic = self.sarcasm.subn('(!)', ' '.join(filter(None, map(self.splits.__getitem__, token_ids))))
+        text, faces = self.emoticons.subn(lambda match: match.group(1).replace(' ', '') + match.group(2), text)
+        if not sarcastic and not faces:
+            return None
+        words = text.lower().split()
+        ids = list(map(self.ids.get, words))
+        if None in ids:
+            ids = [self.ids[word] if word in self.ids else self.add(word) for word in words]
+        return ids
+    def lookup(self, tokens):
+        try:
+            return np.fromiter(map(self.tokens.__getitem__, tokens), dtype=np.intp, count=len(tokens))
+        except KeyError:
+            self.add_tokens([token for token in dict.fromkeys(tokens) if token not in self.tokens])
+            return np.fromiter(map(self.tokens.__getitem__, tokens), dtype=np.intp, count=len(tokens))
+    def encode(self, texts):
+        texts = [text if isinstance(text, str) else '' for text in texts]
+        joined = ' \x00 '.join(texts)
+        if texts and joined.count('\x00') == len(texts) - 1:
+            # Normalize and split the batch as one string; the separator tokens mark document boundaries.
+            token_ids = self.lookup(self.normalize(joined).split())
+            boundaries = token_ids == self.separator
+            owners = np.cumsum(boundaries)[~boundaries]
+            token_ids = token_ids[~boundaries]
+        else:
+            documents = [self.normalize(text).split() for text in texts]
+            token_ids = self.lookup(list(chain.from_iterable(documents)))
+            owners = np.repeat(np.arange(len(documents)), [len(document) for document in documents])
+        document_tokens = np.bincount(owners, minlength=len(texts))
+        counts = self.token_count[token_ids]
+        ends = np.cumsum(counts)
+        # Expand every token to its pieces with one gather instead of concatenating per-token tuples.
+        ids = self.piece_ids[np.repeat(self.token_start[token_ids] - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)]
+        lengths = np.bincount(owners, weights=counts, minlength=len(texts)).astype(np.intp)
+        starts = np.cumsum(document_tokens) - document_tokens
+        rejoin = self.rejoined(token_ids, starts, owners)
+        if not rejoin:
+            return ids, lengths
+        offsets = np.cumsum(lengths) - lengths
+        parts, position = [], 0
+        for document in rejoin:
+            rejoined = self.rejoined_ids(token_ids[starts[document]:starts[document] + document_tokens[document]].tolist())
+            if rejoined is None:
+                continue
+            parts.append(ids[position:offsets[document]])
+            parts.append(np.array(rejoined, dtype=np.intp))
+            position = offsets[document] + lengths[document]
+            lengths[document] = len(rejoined)
+        if not parts:
+            return ids, lengths
+        parts.append(ids[position:])
+        return np.concatenate(parts), lengths
+    def score(self, texts):
+        with self.lock:
+            ids, lengths = self.encode(texts)
+            scores = self.score_ids(ids, lengths)
+            if len(self.ids) - len(self.lexicon) > self.max_unknown or len(self.tokens) > self.max_unknown:
+                self.reset()
+            return scores
+    def score_ids(self, ids, lengths):
+        documents = len(lengths)
+        if len(ids) == 0:
+            return [0.0] * documents
+        position = np.arange(len(ids))
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        def last_before(mask):
+            last = np.maximum.accumulate(np.where(mask, position, -1))
+            last = np.concatenate(([-1], last[:-1]))
+            return np.where(last >= starts, last, -1)
+        # One gather of the packed flag bits, unpacked in the order of columns.
+        flags = self.flags[ids]
+        known, modifier, ly, negation, long, short_retained, exclamation = (flags & (1 << bit) != 0 for bit in range(len(self.columns)))
+        mood = self.mood[ids]
+        # Replays TextBlob's modifier/negation state machine with prefix maxima instead of a loop.
+        previous = last_before(known)
+        has_previous = previous >= 0
+        previous_ly = has_previous & ly[np.maximum(previous, 0)]
+        clears_modifier = ~known & long & ~(negation & previous_ly)
+        modified = has_previous & modifier[np.maximum(previous, 0)] & (last_before(clears_modifier) < previous)
+        modifier_negated = ~known & negation & modified & previous_ly
+        last_negation = last_before(~known & negation)
+        last_clear = last_before(~known & ~negation & ~short_retained)
+        negated = known & (last_negation > previous) & (last_clear < last_negation) & ~modifier_negated[np.maximum(last_negation, 0)]
+        opens = (known & ~modified) | ~np.isnan(mood)
+        openers = np.flatnonzero(opens)
+        if len(openers) == 0:
+            return [0.0] * documents
+        owner = np.cumsum(opens) - 1
+        owned = (owner >= 0) & (openers[np.maximum(owner, 0)] >= starts)
+        merges = np.flatnonzero(known & modified)
+        last_word = openers.copy()
+        np.maximum.at(last_word, owner[merges], merges)
+        anchor = np.maximum(previous[last_word], openers)
+        intensity = np.where(known[anchor], self.intensity[ids[anchor]], 1.0)
+        intensity = np.where(known[anchor] & negated[anchor], 1.0 / intensity, intensity)
+        polarity = np.where(known[openers], self.polarity[ids[openers]], mood[openers])
+        polarity = np.where(last_word != openers, np.clip(self.polarity[ids[last_word]] * intensity, -1.0, 1.0), polarity)
+        boosts = np.flatnonzero(exclamation & owned)
+        boosts = boosts[boosts > last_word[owner[boosts]]]
+        boosts = np.bincount(owner[boosts], minlength=len(openers))
+        polarity = np.where(boosts > 0, np.clip(polarity * 1.25 ** boosts, -1.0, 1.0), polarity)
+        flips = np.bincount(owner[np.flatnonzero(negated | modifier_negated)], minlength=len(openers))
+        polarity = np.where(flips > 0, polarity * -0.5, polarity)
+        document = np.repeat(np.arange(documents), lengths)[openers]
+        totals = np.bincount(document, weights=polarity, minlength=documents)
+        counts = np.bincount(document, minlength=documents)
+        return (totals / np.maximum(counts, 1)).tolist()
+
+class VectorSentimentAnalyzer(SentimentAnalyzer):
+    def __init__(self, cache_size=10000, cache_path=None, lexicon=None):
+        super().__init__(cache_size, cache_path)
+        self.lexicon = lexicon or SentimentLexicon()
+    def polarity(self, text):
+        return self.score_texts([text])[0].result()[0]
+    def score_texts(self, texts):
+        try:
+            with SCORING_SECONDS.time(engine='vector'):
+                scores = self.lexicon.score(texts)
+        except Exception as e:
+            events.log('sentiment_error', "Error in vectorized sentiment analysis, falling back to TextBlob: {error}", error=e)
+            scores = [SentimentAnalyzer.polarity(self, text) for text in texts]
+        future = Future()
+        future.set_result(scores)
+        return [future]
+
+SENTIMENT_ENGINES = {'textblob': SentimentAnalyzer, 'vector': VectorSentimentAnalyzer}
+
+worker_analyzer = None
+
+def warm_worker(engine='textblob'):
+    global worker_analyzer
+    worker_analyzer = SENTIMENT_ENGINES[engine](cache_size=0)
+    worker_analyzer.polarity("warm up the lexicon")
+
+def score_in_worker(texts):
+    return worker_analyzer.analyze_batch(texts)
+
+class PooledSentimentAnalyzer(SentimentAnalyzer):
+    def __init__(self, workers=None, max_pending=None, chunk_size=16, cache_size=10000, cache_path=None, engine='textblob'):
+        if engine not in SENTIMENT_ENGINES:
+            raise ValueError(f"Unknown sentiment engine: {engine}")
+        super().__init__(cache_size, cache_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 2)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker, initargs=(engine,))
+    def submit_chunk(self, texts):
+        self.slots.acquire()
+        submitted = time.perf_counter()
+        try:
+            future = self.executor.submit(score_in_worker, texts)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.chunk_done(submitted))
+        return future
+    def chunk_done(self, submitted):
+        self.slots.release()
+        SCORING_SECONDS.observe(time.perf_counter() - submitted, engine='pool')
+    def score_texts(self, texts):
+        return [self.submit_chunk(texts[i:i + self.chunk_size]) for i in range(0, len(texts), self.chunk_size)]
+    def close(self):
+        self.executor.shutdown(wait=True)
+        super().close()
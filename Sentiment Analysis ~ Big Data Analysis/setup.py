@@ -1,4 +1,5 @@
 import os
+import re
 import subprocess
 import time
 from hadoop_utils import HadoopUtils
@@ -71,18 +72,32 @@ def initialize_keywords():
     except Exception as e:
         print(f"Failed to initialize keywords: {str(e)}")
 
-def create_kafka_topic():
-    print("Creating Kafka topic 'news_articles'...")
-    success, output = run_command('kafka-topics.sh --create --topic news_articles --bootstrap-server localhost:9092 --partitions 1 --replication-factor 1 --if-not-exists', check_output=True)
+def create_kafka_topic(partitions=6):
+    print(f"Creating Kafka topic 'news_articles' with {partitions} partitions...")
+    success, output = run_command(f'kafka-topics.sh --create --topic news_articles --bootstrap-server localhost:9092 --partitions {partitions} --replication-factor 1 --if-not-exists', check_output=True)
     if success:
         print("Kafka topic created successfully.")
-        return True
     elif "already exists" in output:
         print("Kafka topic 'news_articles' already exists.")
-        return True
     else:
         print("Failed to create Kafka topic. Please check your Kafka configuration.")
         return False
+    return ensure_topic_partitions('news_articles', partitions)
+
+def ensure_topic_partitions(topic, partitions):
+    success, output = run_command(f'kafka-topics.sh --describe --topic {topic} --bootstrap-server localhost:9092', check_output=True)
+    if not success:
+        print(f"Failed to describe Kafka topic '{topic}'.")
+        return False
+    match = re.search(r'PartitionCount:\s*(\d+)', output)
+    current = int(match.group(1)) if match else partitions
+    if current >= partitions:
+        return True
+    print(f"Increasing partitions of '{topic}' from {current} to {partitions}...")
+    if not run_command(f'kafka-topics.sh --alter --topic {topic} --partitions {partitions} --bootstrap-server localhost:9092'):
+        print(f"Failed to increase partitions of '{topic}'.")
+        return False
+    return True
 
 def main():
     start_hadoop()
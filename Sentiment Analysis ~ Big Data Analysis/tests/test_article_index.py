@@ -0,0 +1,87 @@
+import os
+import time
+from article_index import ArticleIndex
+from local_file_utils import LocalFileUtils
+
+def result(phrase, text, polarity):
+    return {
+        'phrase': phrase,
+        'scraped_text': text,
+        'articles': [{'title': f"{phrase} headline", 'url': f"https://news.example.com/{phrase}"}],
+        'polarity': polarity,
+        'sentiment': 'positive' if polarity > 0 else 'negative' if polarity < 0 else 'neutral'
+    }
+
+def phrases(found):
+    return {hit['phrase'] for hit in found['hits']}
+
+def build(base_dir):
+    index = ArticleIndex(str(base_dir), flush_docs=1000, merge_factor=3)
+    for i in range(3):
+        index.add_many([result(f"p{i}-{k}", f"market rally batch{i}", 0.5) for k in range(4)])
+        index.flush()
+    return index
+
+def test_merge_combines_segments_and_drops_their_files(tmp_path):
+    index = build(tmp_path)
+    assert len(index.segments) == 1
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith('segment-')) == [index.segments[0].name]
+    assert len(index) == 12
+    assert index.search('market')['total'] == 12
+    assert phrases(index.search('batch1')) == {f"p1-{k}" for k in range(4)}
+
+def test_merge_keeps_only_the_latest_version_of_a_phrase(tmp_path):
+    index = ArticleIndex(str(tmp_path), flush_docs=1000, merge_factor=3)
+    index.add_many([result('shared', 'old story', 0.5), result('other', 'old story', 0.1)])
+    index.flush()
+    index.add_many([result('shared', 'new story', -0.5)])
+    index.flush()
+    index.add_many([result('third', 'new story', 0.0)])
+    index.flush()
+    assert len(index.segments) == 1
+    assert phrases(index.search('old')) == {'other'}
+    assert index.search('shared')['hits'] == [{'phrase': 'shared', 'sentiment': 'negative', 'polarity': -0.5}]
+    assert phrases(index.search('story', sentiment='negative')) == {'shared'}
+
+def test_reload_after_merge_matches_the_merged_index(tmp_path):
+    index = build(tmp_path)
+    index.add_many([result('p0-0', 'market slump', -0.8)])
+    index.close()
+    reloaded = ArticleIndex(str(tmp_path), flush_docs=1000, merge_factor=3)
+    assert [segment.name for segment in reloaded.segments] == [segment.name for segment in index.segments]
+    assert len(reloaded) == 12
+    for query in ('market', 'batch0', 'slump', 'rally'):
+        assert reloaded.search(query) == index.search(query)
+    assert phrases(reloaded.search('market', max_polarity=0.0)) == {'p0-0'}
+    assert reloaded.next_segment == index.next_segment
+
+def test_reload_discards_segments_missing_from_the_manifest(tmp_path):
+    index = build(tmp_path)
+    orphan = tmp_path / 'segment-999999'
+    orphan.mkdir()
+    reloaded = ArticleIndex(str(tmp_path), flush_docs=1000, merge_factor=3)
+    assert not orphan.exists()
+    assert len(reloaded) == len(index)
+
+
+def test_update_from_store_keeps_the_newest_version_across_writers(tmp_path):
+    base_dir = str(tmp_path / 'store') + os.sep
+    now = time.time()
+    LocalFileUtils(base_dir, writer_id=0).get_store('articles.json').append_many({'shared': result('shared', 'fresh take', 0.8)}, ts=now)
+    LocalFileUtils(base_dir, writer_id=1).get_store('articles.json').append_many({'shared': result('shared', 'stale take', -0.9), 'other': result('other', 'stale take', 0.2)}, ts=now - 60)
+    index = ArticleIndex(str(tmp_path / 'index'), flush_docs=1000, merge_factor=3)
+    assert index.update_from_store(LocalFileUtils(base_dir)) == 2
+    assert index.search('shared')['hits'] == [{'phrase': 'shared', 'sentiment': 'positive', 'polarity': 0.8}]
+    assert phrases(index.search('stale')) == {'other'}
+    LocalFileUtils(base_dir, writer_id=1).get_store('articles.json').append_many({'shared': result('shared', 'stale again', -0.5)}, ts=now - 30)
+    reloaded = ArticleIndex(str(tmp_path / 'index'), flush_docs=1000, merge_factor=3)
+    assert reloaded.update_from_store(LocalFileUtils(base_dir)) == 0
+    assert reloaded.search('shared')['hits'][0]['polarity'] == 0.8
+
+def test_merge_and_reload_keep_document_timestamps(tmp_path):
+    index = build(tmp_path)
+    stamped = index.versions['p1-2']
+    reloaded = ArticleIndex(str(tmp_path), flush_docs=1000, merge_factor=3)
+    assert reloaded.versions['p1-2'] == stamped
+    assert not reloaded.add_locked('p1-2', result('p1-2', 'older', 0.0), ts=stamped - 1)
+    assert reloaded.add_locked('p1-2', result('p1-2', 'newer', 0.0), ts=stamped + 1)
@@ -0,0 +1,76 @@
+from benchmarks.fakes import FakeWebHdfs
+from hadoop_utils import HadoopUtils
+
+PATH = '/user/news/articles.json'
+
+class InterleavingHdfs(FakeWebHdfs):
+    def __init__(self):
+        super().__init__()
+        self.on_publish = None
+    def write(self, hdfs_path, data=None, **kwargs):
+        if hdfs_path.endswith('.tmp') and self.on_publish:
+            hook, self.on_publish = self.on_publish, None
+            hook()
+        return super().write(hdfs_path, data, **kwargs)
+
+def hadoop(client=None):
+    utils = HadoopUtils(compact_interval=0, compact_min_bytes=1)
+    utils.client = client or FakeWebHdfs()
+    return utils
+
+def stored(utils):
+    return sorted(name for name in utils.client.files if name.startswith(PATH + '.'))
+
+def test_append_compact_append():
+    utils = hadoop()
+    utils.write_to_hdfs(PATH, {'old': 1, 'kept': 2})
+    utils.append_to_hdfs(PATH, {'old': 10, 'new': 3})
+    assert utils.read_from_hdfs(PATH) == {'old': 10, 'kept': 2, 'new': 3}
+    assert utils.compaction_due(PATH)
+    assert utils.compact(PATH)
+    assert not utils.compaction_due(PATH)
+    assert not utils.compact(PATH)
+    utils.append_to_hdfs(PATH, {'new': 4, 'late': 5})
+    assert utils.read_from_hdfs(PATH) == {'old': 10, 'kept': 2, 'new': 4, 'late': 5}
+    assert [utils.lookup_in_hdfs(PATH, key) for key in ('old', 'kept', 'new', 'late', 'missing')] == [10, 2, 4, 5, None]
+    assert utils.compact(PATH)
+    assert utils.read_from_hdfs(PATH) == {'old': 10, 'kept': 2, 'new': 4, 'late': 5}
+    assert utils.lookup_in_hdfs(PATH, 'new') == 4
+
+def test_compaction_keeps_one_previous_version_and_no_temp_files():
+    utils = hadoop()
+    for i in range(4):
+        utils.append_to_hdfs(PATH, {f"k{i}": i})
+        assert utils.compact(PATH)
+    offsets = utils.compacted_offsets(PATH)
+    assert len(offsets) == 2
+    assert stored(utils) == sorted([PATH + '.log'] + [utils.compacted_path(PATH, kind, offset) for kind in ('idx', 'snapshot') for offset in offsets])
+
+def test_append_during_compaction_is_not_lost():
+    client = InterleavingHdfs()
+    utils = hadoop(client)
+    utils.append_to_hdfs(PATH, {'a': 1, 'b': 2})
+    client.on_publish = lambda: utils.append_to_hdfs(PATH, {'b': 20, 'c': 3})
+    assert utils.compact(PATH)
+    assert client.on_publish is None
+    assert utils.read_from_hdfs(PATH) == {'a': 1, 'b': 20, 'c': 3}
+    assert [utils.lookup_in_hdfs(PATH, key) for key in 'abc'] == [1, 20, 3]
+    assert utils.compaction_due(PATH)
+    assert utils.compact(PATH)
+    assert utils.read_from_hdfs(PATH) == {'a': 1, 'b': 20, 'c': 3}
+    assert [utils.lookup_in_hdfs(PATH, key) for key in 'abc'] == [1, 20, 3]
+
+def test_appending_starts_the_background_compactor():
+    utils = HadoopUtils(compact_interval=0.01, compact_min_bytes=1)
+    utils.client = FakeWebHdfs()
+    utils.append_to_hdfs(PATH, {'a': 1})
+    try:
+        assert utils.compactor is not None
+        for _ in range(500):
+            if utils.compacted_offsets(PATH):
+                break
+            utils.stop_event.wait(0.01)
+        assert utils.compacted_offsets(PATH)
+    finally:
+        utils.stop_compactor()
+    assert utils.compactor is None
@@ -0,0 +1,48 @@
+import os
+import time
+import requests
+from benchmarks.fakes import StubSourceAdapter
+from http_cache import ResponseCache
+
+URL = 'https://newsapi.org/v2/everything'
+
+def session():
+    adapter = StubSourceAdapter()
+    client = requests.Session()
+    client.mount('https://', adapter)
+    return client, adapter
+
+def test_requests_with_different_headers_do_not_share_an_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    client, adapter = session()
+    for key in ('first', 'second', 'first'):
+        response = cache.request(client, 'newsapi', 'GET', URL, params={'q': 'energy'}, headers={'X-Api-Key': key})
+    assert adapter.requests == 2
+    assert response.from_cache
+    cache.request(client, 'newsapi', 'GET', URL, params={'q': 'energy'}, headers={'x-api-key': 'first', 'Accept': 'application/json'})
+    assert adapter.requests == 3
+    assert cache.key('GET', URL, headers={'X-Api-Key': 'first'}) == cache.key('GET', URL, headers={'x-api-key': 'first'})
+    assert not any('first' in name for name in os.listdir(tmp_path))
+
+def test_disk_cache_is_pruned_by_age_and_size(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_disk_bytes=10 ** 6, max_disk_age=3600, prune_every=1000)
+    entry = {'status_code': 200, 'body': 'x' * 1000, 'etag': None, 'last_modified': None, 'stored_at': time.time()}
+    for i in range(10):
+        cache.put(f"key{i}", entry)
+        stamp = time.time() - 100 * (10 - i)
+        os.utime(tmp_path / f"key{i}.json", (stamp, stamp))
+    os.utime(tmp_path / 'key0.json', (time.time() - 7200, time.time() - 7200))
+    assert cache.prune() == 1
+    cache.max_disk_bytes = 5000
+    assert cache.prune() == 5
+    assert sorted(os.listdir(tmp_path)) == [f"key{i}.json" for i in range(6, 10)]
+
+def test_puts_trigger_pruning(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_disk_bytes=3000, prune_every=4)
+    entry = {'status_code': 200, 'body': 'x' * 1000, 'etag': None, 'last_modified': None, 'stored_at': time.time()}
+    for i in range(8):
+        cache.put(f"key{i}", entry)
+    assert len(os.listdir(tmp_path)) <= 4
+    reopened = ResponseCache(str(tmp_path), max_disk_bytes=1500)
+    assert len(os.listdir(tmp_path)) == 1
+    assert reopened.get(os.listdir(tmp_path)[0][:-len('.json')]) == entry
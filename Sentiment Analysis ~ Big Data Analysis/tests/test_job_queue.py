@@ -0,0 +1,40 @@
+import queue
+import pytest
+from job_queue import PhraseQueue
+
+def interrupted_put(*args, **kwargs):
+    raise KeyboardInterrupt
+
+def test_interrupted_submit_is_rolled_back(monkeypatch):
+    jobs = PhraseQueue(lambda phrase: 'done', workers=1, max_pending=1)
+    assert jobs.submit('first') == 'queued'
+    monkeypatch.setattr(jobs.jobs, 'put', interrupted_put)
+    with pytest.raises(KeyboardInterrupt):
+        jobs.submit('second')
+    assert jobs.status('second') is None
+    assert jobs.pending == 1
+    monkeypatch.undo()
+    jobs.start()
+    assert jobs.drain(timeout=3)
+    assert jobs.status('first')['status'] == 'done'
+    jobs.close()
+
+def test_interrupted_resubmit_restores_the_previous_job(monkeypatch):
+    jobs = PhraseQueue(lambda phrase: 'done', workers=1).start()
+    assert jobs.submit('phrase') == 'queued'
+    assert jobs.drain(timeout=3)
+    jobs.accepting = True
+    monkeypatch.setattr(jobs.jobs, 'put', interrupted_put)
+    with pytest.raises(KeyboardInterrupt):
+        jobs.submit('phrase')
+    assert jobs.status('phrase')['status'] == 'done'
+    assert jobs.pending == 0
+    monkeypatch.undo()
+    jobs.close()
+
+def test_full_queue_rejects_without_blocking():
+    jobs = PhraseQueue(lambda phrase: 'done', workers=0, max_pending=1)
+    assert jobs.submit('first', block=False) == 'queued'
+    assert jobs.submit('second', block=False) == 'rejected'
+    assert jobs.status('second')['status'] == 'rejected'
+    assert jobs.counts()['pending'] == 1
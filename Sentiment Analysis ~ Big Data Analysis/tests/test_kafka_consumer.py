@@ -0,0 +1,65 @@
+import contextlib
+import sys
+import pytest
+from benchmarks.fakes import FakeBroker
+
+class FlakySink:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.stored = []
+        self.closed = False
+    def write_many(self, results):
+        if self.fail_on & {result['phrase'] for result in results}:
+            raise IOError('disk full')
+        self.stored.extend(result['phrase'] for result in results)
+    def checkpoint(self, force=False):
+        return True
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = FakeBroker(partitions=1)
+    module = broker.module()
+    monkeypatch.setitem(sys.modules, 'confluent_kafka', module)
+    import kafka_consumer
+    monkeypatch.setattr(kafka_consumer, 'Consumer', module.Consumer)
+    return broker
+
+def produce(broker, count):
+    from message_codec import MessageCodec
+    codec = MessageCodec()
+    for i in range(count):
+        broker.append('news', None, codec.encode({'phrase': f"p{i}", 'scraped_text': 'good news', 'articles': []}))
+
+def consume(sink, batch_size, limit=10):
+    from kafka_consumer import NewsConsumer
+    consumer = NewsConsumer('news', 'group', batch_size=batch_size, max_latency=0.05, sentiment_engine='vector', sinks=[sink])
+    results = []
+    with pytest.raises(IOError) if batch_size > 1 else contextlib.nullcontext():
+        results.extend(result['phrase'] for result in consumer.stream(time_limit=1.0, article_limit=limit))
+    return results
+
+def committed(broker):
+    return broker.committed.get(('group', 'news', 0))
+
+def test_single_message_sink_failure_is_not_committed(broker):
+    produce(broker, 5)
+    sink = FlakySink(fail_on={'p1'})
+    assert consume(sink, batch_size=1) == ['p0']
+    assert committed(broker) == 1
+    assert sink.closed
+
+def test_invalid_messages_are_committed_past(broker):
+    broker.append('news', None, b'not a message')
+    produce(broker, 2)
+    sink = FlakySink()
+    assert consume(sink, batch_size=1, limit=2) == ['p0', 'p1']
+    assert committed(broker) == 3
+
+def test_batch_sink_failure_does_not_commit_later_batches(broker):
+    produce(broker, 9)
+    sink = FlakySink(fail_on={'p4'})
+    assert consume(sink, batch_size=3) == ['p0', 'p1', 'p2']
+    assert sink.stored == ['p0', 'p1', 'p2']
+    assert committed(broker) == 3
@@ -0,0 +1,34 @@
+import json
+import os
+import time
+from local_file_utils import LocalFileUtils
+
+def write_legacy(base_dir, results, age=100):
+    path = os.path.join(base_dir, 'articles.json')
+    with open(path, 'w', encoding='utf-8') as writer:
+        json.dump(results, writer)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+def legacy_keys(file_utils):
+    return sorted(record['key'] for record in file_utils.scan_since('articles.json', {}) if record['value']['polarity'] == -1.0)
+
+def test_group_readers_do_not_reimport_the_legacy_file(tmp_path):
+    base_dir = str(tmp_path) + os.sep
+    write_legacy(base_dir, {'a': {'phrase': 'a', 'polarity': -1.0}, 'b': {'phrase': 'b', 'polarity': -1.0}})
+    LocalFileUtils(base_dir, writer_id=0).append_to_file('articles.json', {'a': {'phrase': 'a', 'polarity': 0.9}})
+    reader = LocalFileUtils(base_dir)
+    assert reader.lookup('articles.json', 'a') == {'phrase': 'a', 'polarity': 0.9}
+    assert dict(reader.read_records('articles.json'))['a']['polarity'] == 0.9
+    assert legacy_keys(reader) == ['a', 'b']
+    assert sorted(os.listdir(tmp_path / 'articles')) == ['writer-0', 'writer-legacy']
+
+def test_single_process_import_is_not_repeated_for_a_group(tmp_path):
+    base_dir = str(tmp_path) + os.sep
+    write_legacy(base_dir, {'a': {'phrase': 'a', 'polarity': -1.0}})
+    LocalFileUtils(base_dir).get_store('articles.json').close()
+    LocalFileUtils(base_dir, writer_id=1).append_to_file('articles.json', {'a': {'phrase': 'a', 'polarity': 0.5}})
+    reader = LocalFileUtils(base_dir)
+    assert reader.lookup('articles.json', 'a') == {'phrase': 'a', 'polarity': 0.5}
+    assert legacy_keys(reader) == ['a']
+    assert not os.path.exists(tmp_path / 'articles' / 'writer-legacy')
@@ -0,0 +1,52 @@
+import os
+from log_store import LogStore
+
+def fill(store, rounds, keys=20):
+    for i in range(rounds):
+        store.append_many({f"phrase {k}": {'round': i, 'text': 'x' * 50} for k in range(keys)})
+
+def test_compaction_keeps_latest_values_and_drops_old_segments(tmp_path):
+    store = LogStore(str(tmp_path), segment_max_bytes=2048, compact_after_segments=100)
+    fill(store, 10)
+    assert len(store._segments()) > 2
+    store.compact()
+    assert len([segment for segment in store._segments() if segment != store.active]) == 1
+    assert len(store) == 20
+    assert all(store.get(f"phrase {k}")['round'] == 9 for k in range(20))
+    store.close()
+
+def test_rolling_past_the_threshold_compacts(tmp_path):
+    store = LogStore(str(tmp_path), segment_max_bytes=1024, compact_after_segments=3)
+    fill(store, 20)
+    assert len(store._segments()) < 3
+    assert dict(store.records()) == {f"phrase {k}": {'round': 19, 'text': 'x' * 50} for k in range(20)}
+    store.close()
+
+def test_reopen_after_compaction_uses_the_index(tmp_path):
+    store = LogStore(str(tmp_path), segment_max_bytes=2048, compact_after_segments=100)
+    fill(store, 10)
+    store.compact()
+    store.append('phrase 3', {'round': 10})
+    store.close()
+    assert os.path.exists(tmp_path / 'index.json')
+    reopened = LogStore(str(tmp_path), segment_max_bytes=2048, compact_after_segments=100)
+    assert len(reopened) == 20
+    assert reopened.get('phrase 3') == {'round': 10}
+    assert reopened.get('phrase 4')['round'] == 9
+    assert reopened.timestamp('phrase 3') == store.timestamp('phrase 3')
+    reopened.append('phrase 5', {'round': 11})
+    reopened.close()
+    assert LogStore(str(tmp_path), read_only=True).get('phrase 5') == {'round': 11}
+
+def test_reopen_rescans_when_the_index_is_stale(tmp_path):
+    store = LogStore(str(tmp_path), segment_max_bytes=2048, compact_after_segments=100)
+    fill(store, 3)
+    store.compact()
+    store.append('late', 1)
+    store.close()
+    with open(tmp_path / 'index.json', 'w', encoding='utf-8') as writer:
+        writer.write('{not json')
+    reopened = LogStore(str(tmp_path), read_only=True)
+    assert len(reopened) == 21
+    assert reopened.get('late') == 1
+    assert reopened.get('phrase 0')['round'] == 2
@@ -0,0 +1,76 @@
+import sys
+import time
+import pyarrow.parquet as pq
+from pyarrow import fs
+from benchmarks.fakes import FakeBroker
+from message_codec import MessageCodec
+from parquet_sink import SCHEMA, SCORED_SCHEMA, ParquetSink
+
+DAY = 86400 * 1000
+
+def record(i, day=0, **extra):
+    return {'phrase': f"phrase {i}", 'scraped_text': 'text ' * 10, 'articles': [{'title': f"title {i}", 'url': f"https://news.example.com/{i}"}], 'timestamp': 1700000000000 + day * DAY, **extra}
+
+def sink(tmp_path, **options):
+    return ParquetSink(str(tmp_path / 'archive'), filesystem=fs.LocalFileSystem(), **options)
+
+def parquet_files(tmp_path):
+    return sorted(path for path in (tmp_path / 'archive').rglob('*.parquet'))
+
+def test_rolls_bounded_files_partitioned_by_date(tmp_path):
+    archive = sink(tmp_path, max_rows=4)
+    for i in range(6):
+        archive.write(record(i, day=i % 2))
+        archive.checkpoint()
+    files = parquet_files(tmp_path)
+    assert [path.parent.name for path in files] == ['date=2023-11-14', 'date=2023-11-15']
+    assert archive.checkpoint(force=True)
+    files = parquet_files(tmp_path)
+    assert len(files) == 4
+    table = pq.read_table([str(path) for path in files], schema=SCHEMA)
+    assert sorted(table.column('phrase').to_pylist()) == [f"phrase {i}" for i in range(6)]
+    assert table.column('articles').to_pylist()[0][0]['title'].startswith('title')
+
+def test_idle_gap_does_not_roll_a_single_row(tmp_path):
+    archive = sink(tmp_path, max_seconds=60)
+    archive.opened_at = time.time() - 3600
+    archive.write(record(0))
+    assert not archive.roll_due()
+    assert archive.checkpoint() is False
+    assert parquet_files(tmp_path) == []
+    archive.opened_at = time.time() - 61
+    assert archive.roll_due()
+    assert archive.checkpoint()
+    assert len(parquet_files(tmp_path)) == 1
+
+def test_scored_schema_keeps_sentiment(tmp_path):
+    archive = sink(tmp_path, schema=SCORED_SCHEMA)
+    archive.write_many([record(0, sentiment='positive', polarity=0.5), record(1, sentiment='negative', polarity=-0.25)])
+    archive.close()
+    table = pq.read_table(str(parquet_files(tmp_path)[0]))
+    assert table.column('polarity').to_pylist() == [0.5, -0.25]
+    assert table.column('sentiment').to_pylist() == ['positive', 'negative']
+
+def test_archiver_writes_consumed_messages_and_commits_after_rolling(tmp_path, monkeypatch):
+    broker = FakeBroker(partitions=2)
+    module = broker.module()
+    monkeypatch.setitem(sys.modules, 'confluent_kafka', module)
+    import kafka_to_hdfs_consumer
+    monkeypatch.setattr(kafka_to_hdfs_consumer, 'Consumer', module.Consumer)
+    codec = MessageCodec()
+    for i in range(25):
+        broker.append('news', f"phrase {i}".encode('utf-8'), codec.encode({'phrase': f"phrase {i}", 'scraped_text': 'text', 'articles': []}))
+    broker.append('news', b'bad', b'not a message')
+    archiver = kafka_to_hdfs_consumer.HdfsArchiver('news', 'archive', str(tmp_path / 'archive'), batch_size=10, max_latency=0.01, max_rows=10, filesystem=fs.LocalFileSystem())
+    consume = archiver.consumer.consume
+    def consume_until_empty(**kwargs):
+        msgs = consume(**kwargs)
+        if not msgs:
+            raise KeyboardInterrupt
+        return msgs
+    archiver.consumer.consume = consume_until_empty
+    archiver.run()
+    table = pq.read_table([str(path) for path in parquet_files(tmp_path)], schema=SCHEMA)
+    assert sorted(table.column('phrase').to_pylist()) == sorted(f"phrase {i}" for i in range(25))
+    assert len(parquet_files(tmp_path)) <= 4
+    assert sum(offset for (group, _, _), offset in broker.committed.items() if group == 'archive') == 26
@@ -0,0 +1,56 @@
+import threading
+from benchmarks.fakes import FakeWebHdfs
+from phrase_cache import PhraseCache
+
+ROOT = '/user/hadoop/news_data/'
+
+class GatedHdfs(FakeWebHdfs):
+    def __init__(self):
+        super().__init__()
+        self.listing = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.lists = 0
+    def list(self, hdfs_path, status=False):
+        self.lists += 1
+        self.listing.set()
+        self.release.wait(5)
+        return super().list(hdfs_path, status)
+
+def store(client, phrase):
+    client.files[f"{ROOT}{phrase}.json"] = b'{}'
+
+def test_due_refresh_runs_once_in_the_background():
+    client = GatedHdfs()
+    store(client, 'old')
+    cache = PhraseCache(client, ROOT, refresh_interval=3600)
+    cache.warm()
+    cache.warmed_at -= 3600
+    client.listing.clear()
+    client.release.clear()
+    store(client, 'new')
+    refresh = cache.start_refresh(cache.warmed_at + 3600)
+    assert client.listing.wait(5)
+    assert cache.exists(cache.path_for('old'))
+    assert not cache.exists(cache.path_for('missing'))
+    assert cache.start_refresh(cache.warmed_at + 3600) is None
+    assert client.lists == 2
+    client.release.set()
+    refresh.join(5)
+    assert not cache.refreshing
+    assert cache.path_for('new') in cache.bloom
+    assert cache.exists(cache.path_for('new'))
+    assert client.lists == 2
+
+def test_refresh_keeps_phrases_written_during_the_listing():
+    client = GatedHdfs()
+    cache = PhraseCache(client, ROOT)
+    client.release.clear()
+    warming = threading.Thread(target=cache.warm)
+    warming.start()
+    assert client.listing.wait(5)
+    cache.mark_written(cache.path_for('fresh'))
+    client.release.set()
+    warming.join(5)
+    assert cache.exists(cache.path_for('fresh'))
+    assert cache.stats()['namenode_lookups'] == 0
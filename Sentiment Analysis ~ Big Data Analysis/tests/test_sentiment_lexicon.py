@@ -0,0 +1,65 @@
+import random
+import pytest
+from textblob import TextBlob
+from textblob.en import sentiment
+from sentiment_analyzer import PooledSentimentAnalyzer, SentimentLexicon, VectorSentimentAnalyzer
+
+EDGE_CASES = [
+    '', ' ', '.', '!!!', 'good', 'Good!', 'not good', 'not very good', "isn't bad", 'never ever happy',
+    'very very good!!', 'extremely bad.', 'really good, but not great', 'GREAT news', 'the market said nothing',
+    'happy :) sad :(', 'well : ) then', 'what a day :-D', 'wow (!) amazing', 'ok ( ! ) fine', ';) winking',
+    "it's good", "don't like it", 'good\x00bad', 'bad\x00', 'a\x00\x00b good', 'unseen-word zzqx good',
+    'good...', '"great"', 'good' * 50, 'no no no', 'bad bad not bad', 'terrible!', 'Terribly good',
+]
+
+def random_texts(count, seed=3):
+    rng = random.Random(seed)
+    words = sorted(sentiment.keys()) + ['the', 'not', 'very', 'never', '!', '.', ',', ':)', '(!)', "isn't", 'qqq', 'Zebra']
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+def textblob_scores(texts):
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+def test_edge_cases_match_textblob():
+    assert SentimentLexicon().score(EDGE_CASES) == pytest.approx(textblob_scores(EDGE_CASES), abs=1e-12)
+
+def test_each_text_matches_when_scored_alone():
+    lexicon = SentimentLexicon()
+    for text in EDGE_CASES:
+        assert lexicon.score([text]) == pytest.approx(textblob_scores([text]), abs=1e-12), text
+
+def test_random_batches_match_textblob():
+    lexicon = SentimentLexicon()
+    texts = random_texts(400)
+    for i in range(0, len(texts), 64):
+        batch = texts[i:i + 64]
+        assert lexicon.score(batch) == pytest.approx(textblob_scores(batch), abs=1e-12)
+
+def test_scores_survive_unknown_vocabulary_reset():
+    lexicon = SentimentLexicon(max_unknown=20)
+    fresh = len(lexicon.tokens)
+    texts = [f"novel{i} token{i} good" if i % 2 else f"fresh{i} not bad" for i in range(60)]
+    sizes = []
+    for i in range(0, len(texts), 7):
+        batch = texts[i:i + 7]
+        assert lexicon.score(batch) == pytest.approx(textblob_scores(batch), abs=1e-12)
+        sizes.append(len(lexicon.tokens))
+    assert fresh in sizes
+    assert max(sizes) <= 20
+
+def test_vector_analyzer_matches_textblob_through_the_cache():
+    analyzer = VectorSentimentAnalyzer(cache_size=100)
+    texts = EDGE_CASES[:10] + EDGE_CASES[:10]
+    assert analyzer.analyze_batch(texts) == pytest.approx(textblob_scores(texts), abs=1e-12)
+
+def test_pool_scores_with_the_vector_engine():
+    texts = random_texts(40, seed=9)
+    analyzer = PooledSentimentAnalyzer(workers=1, chunk_size=16, cache_size=0, engine='vector')
+    try:
+        assert analyzer.analyze_batch(texts) == pytest.approx(textblob_scores(texts), abs=1e-12)
+    finally:
+        analyzer.close()
+
+def test_pool_rejects_unknown_engines():
+    with pytest.raises(ValueError):
+        PooledSentimentAnalyzer(workers=1, engine='nope')